@@ -0,0 +1,155 @@
+"""Accuracy of the fast energy engines against the reference ``compute_features``.
+
+Every engine computes (T, F) features for a fixed matrix of stimuli (drifting gratings over phases,
+speeds and orientations, plus white noise) and is compared channel by channel with the default
+float64 ``compute_features``, next to its speedup over the reference:
+
+    python -m benchmarks.accuracy --output accuracy.json
+
+An engine passes when the RMSE of every channel, relative to the reference's peak energy (as printed
+by ``assert_energy_rmse_ok`` in tests/test_motion_energy.py), is below the engine's tolerance.
+tests/test_accuracy.py runs every registered engine, so a new one is checked by registering it:
+
+    @accuracy.engine("my_engine", tolerance=1e-3)
+    def my_engine(stimulus, frequencies, thetas, px_pitch):
+        ...
+"""
+
+import argparse
+import json
+import sys
+from time import perf_counter
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from motionenergy import drifting_sinusoidal, energy as energy_module
+
+FREQUENCIES = [1.0, 2.0, 4.0]
+THETAS = [0.0, 45.0, 90.0, 135.0]
+PX_PITCH = 0.05
+
+
+class Engine(NamedTuple):
+    name: str
+    run: Callable[[NDArray[np.floating], list[float], list[float], float], NDArray[np.floating]]
+    tolerance: float  # largest relative RMSE accepted on any channel
+
+
+ENGINES: dict[str, Engine] = {}
+
+
+def engine(name: str, tolerance: float) -> Callable:
+    """Register `run(stimulus, frequencies, thetas, px_pitch) -> (T, F) features` as an engine."""
+    def register(run: Callable) -> Callable:
+        ENGINES[name] = Engine(name, run, tolerance)
+        return run
+    return register
+
+
+@engine("float32", tolerance=1e-5)
+def _float32(stimulus, frequencies, thetas, px_pitch):
+    return energy_module.compute_features(stimulus, frequencies, thetas, px_pitch, dtype=np.float32)
+
+
+@engine("analytic", tolerance=1e-2)
+def _analytic(stimulus, frequencies, thetas, px_pitch):
+    return energy_module.compute_features(stimulus, frequencies, thetas, px_pitch, analytic=True)
+
+
+@engine("delta", tolerance=1e-10)
+def _delta(stimulus, frequencies, thetas, px_pitch):
+    return energy_module.compute_features(stimulus, frequencies, thetas, px_pitch, delta_resync=4)
+
+
+@engine("extend", tolerance=1e-10)
+def _extend(stimulus, frequencies, thetas, px_pitch):
+    # the lowest frequency first, then the rest of the bank added to it
+    workspace = energy_module.EnergyWorkspace()
+    features = energy_module.compute_features(stimulus, frequencies[:1], thetas, px_pitch, workspace=workspace)
+    new_channels = [(f, theta) for f in frequencies[1:] for theta in thetas]
+    merged, channels = energy_module.extend_features(stimulus, features, workspace.channels, new_channels, px_pitch)
+    order = {channel: i for i, channel in enumerate(channels)}
+    return merged[:, [order[(float(f), float(theta))] for f in frequencies for theta in thetas]]
+
+
+def stimulus_matrix(size_deg: float = 2.0, time: float = 0.1, fps: float = 60.0, px_pitch: float = PX_PITCH,
+                    seed: int = 0) -> list[tuple[str, NDArray[np.floating]]]:
+    """Named (T, H, W) stimuli: gratings at 2 phases x 2 speeds x 3 orientations, and 2 white noise movies."""
+    stimuli = []
+    for phase in (0.0, np.pi / 2):
+        for speed in (0.5, 2.0):
+            for theta in (0.0, 30.0, 45.0):
+                stimulus = drifting_sinusoidal.new_stimulus(speed, (size_deg, size_deg), theta, phase, 2.0, 1.0,
+                                                            time, fps, px_pitch)
+                stimuli.append((f"grating phase={phase:.2f} speed={speed} theta={theta}", stimulus))
+    rng = np.random.default_rng(seed)
+    shape = stimuli[0][1].shape
+    for index in range(2):
+        stimuli.append((f"noise {index}", rng.standard_normal(shape)))
+    return stimuli
+
+
+def channel_errors(features: NDArray[np.floating], reference: NDArray[np.floating]) -> dict:
+    """Per-channel RMSE over frames, absolute and relative to the reference's peak energy."""
+    rmse = np.sqrt(((features - reference) ** 2).mean(axis=0))
+    return {"rmse": rmse.tolist(), "relative_rmse": (rmse / np.abs(reference).max()).tolist()}
+
+
+def evaluate(engine: Engine, stimuli: list[tuple[str, NDArray[np.floating]]], frequencies: list[float] = FREQUENCIES,
+             thetas: list[float] = THETAS, px_pitch: float = PX_PITCH) -> dict:
+    """Errors of `engine` on every stimulus, and its speedup over the reference on the whole matrix."""
+    reference_time = engine_time = 0.0
+    results = []
+    for name, stimulus in stimuli:
+        start = perf_counter()
+        reference = energy_module.compute_features(stimulus, frequencies, thetas, px_pitch)
+        reference_time += perf_counter() - start
+        start = perf_counter()
+        features = engine.run(stimulus, frequencies, thetas, px_pitch)
+        engine_time += perf_counter() - start
+        if features.shape != reference.shape:
+            raise ValueError(f"engine {engine.name} returned shape {features.shape}, expected {reference.shape}")
+        results.append({"stimulus": name, **channel_errors(features, reference)})
+    max_relative_rmse = max(max(result["relative_rmse"]) for result in results)
+    return {
+        "engine": engine.name,
+        "tolerance": engine.tolerance,
+        "max_relative_rmse": max_relative_rmse,
+        "passed": max_relative_rmse < engine.tolerance,
+        "speedup": reference_time / engine_time,
+        "channels": [[f, theta] for f in frequencies for theta in thetas],
+        "stimuli": results,
+    }
+
+
+def run_accuracy(engines: Optional[list[str]] = None, **matrix_options) -> list[dict]:
+    stimuli = stimulus_matrix(**matrix_options)
+    reports = []
+    for name in engines or list(ENGINES):
+        report = evaluate(ENGINES[name], stimuli)
+        print(f"[accuracy] {name:<10} max relative RMSE {report['max_relative_rmse']:.2e} "
+              f"(tolerance {report['tolerance']:.0e}) speedup {report['speedup']:.2f}x "
+              f"{'ok' if report['passed'] else 'FAILED'}")
+        reports.append(report)
+    return reports
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--size", type=float, default=2.0, help="stimulus size in degrees")
+    parser.add_argument("--duration", type=float, default=0.1, help="stimulus duration in seconds")
+    parser.add_argument("--output", help="write the per-channel report to this JSON file")
+    args = parser.parse_args(argv)
+
+    reports = run_accuracy(args.engines, size_deg=args.size, time=args.duration)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(reports, output, indent=2)
+    return 0 if all(report["passed"] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""Benchmarks for stimulus generation, filter bank construction and energy extraction.
+
+Run from the repository root, e.g.
+
+    python -m benchmarks.energy_benchmarks --sizes 2 5 --durations 1 --output bench.json
+    python -m benchmarks.energy_benchmarks --compare baseline.json bench.json
+
+Every (case, stage) runs in a fresh process so that its peak RSS is not polluted by earlier stages.
+The cold import time of the compute modules is measured the same way, since worker start-up
+dominates short jobs. Results are written as JSON so runs can be diffed; ``--compare`` flags stages
+that got slower.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Optional
+
+import numpy as np
+
+STAGES = ("new_stimulus", "new_filter_bank", "compute_features")
+IMPORT_MODULES = ("motionenergy.drifting_sinusoidal", "motionenergy.gabor", "motionenergy.energy",
+                  "motionenergy.psychometric_analysis")
+# compute_features options benchmarked as separate engines
+ENGINES = {
+    "default": {},
+    "float32": {"dtype": np.float32},
+    "analytic": {"analytic": True},
+    "delta": {"delta_resync": 16},
+}
+
+
+def new_case(size_deg: float, time: float, fps: float, px_pitch: float, num_frequencies: int,
+             num_thetas: int) -> dict:
+    """A benchmark case: a square grating stimulus and a bank of num_frequencies x num_thetas channels."""
+    return {
+        "size_deg": size_deg,
+        "time": time,
+        "fps": fps,
+        "px_pitch": px_pitch,
+        "num_frequencies": num_frequencies,
+        "num_thetas": num_thetas,
+    }
+
+
+def case_grid(sizes: list[float], durations: list[float], fps: list[float], px_pitches: list[float],
+              num_frequencies: list[int], num_thetas: list[int]) -> list[dict]:
+    return [new_case(*values) for values in itertools.product(sizes, durations, fps, px_pitches,
+                                                               num_frequencies, num_thetas)]
+
+
+def bank_parameters(case: dict) -> tuple[list[float], list[float]]:
+    # octave-spaced frequencies up to the stimulus' 0.4 * sampling rate, orientations evenly over 180 degrees
+    max_frequency = 0.4 / case["px_pitch"]
+    frequencies = [max_frequency / 2 ** (i + 1) for i in range(case["num_frequencies"])][::-1]
+    thetas = list(np.arange(case["num_thetas"]) * 180.0 / case["num_thetas"])
+    return frequencies, thetas
+
+
+def run_stage(case: dict, stage: str, engine: str = "default", repeats: int = 1) -> dict:
+    """Time one stage of one case in the current process.
+
+    Returns:
+        wall time (best of `repeats`), peak RSS of the process and the increase of the peak over the
+        stage's inputs, and the throughput of the stage
+    """
+    from motionenergy import drifting_sinusoidal, energy, gabor, instrumentation
+
+    frequencies, thetas = bank_parameters(case)
+    stimulus_args = (1.0, (case["size_deg"], case["size_deg"]), 45.0, 0.0, frequencies[-1] / 2, 1.0,
+                     case["time"], case["fps"], case["px_pitch"])
+    if stage == "new_stimulus":
+        run = lambda: drifting_sinusoidal.new_stimulus(*stimulus_args)
+    elif stage == "new_filter_bank":
+        run = lambda: gabor.new_filter_bank(frequencies, thetas, case["px_pitch"])
+    elif stage == "compute_features":
+        stimulus = drifting_sinusoidal.new_stimulus(*stimulus_args)
+        options = ENGINES[engine]
+        run = lambda: energy.compute_features(stimulus, frequencies, thetas, case["px_pitch"], **options)
+    else:
+        raise ValueError(f"unknown stage {stage!r}; expected one of {STAGES}")
+
+    baseline_rss = _peak_rss_bytes()
+    timings = []
+    for _ in range(repeats):
+        with instrumentation.record() as recorder:
+            start = perf_counter()
+            run()
+            timings.append(perf_counter() - start)
+    wall = min(timings)
+    peak_rss = _peak_rss_bytes()
+
+    frames = int(np.ceil(case["time"] * case["fps"]))
+    channels = len(frequencies) * len(thetas)
+    if stage == "new_stimulus":
+        work, unit = frames, "frames/s"
+    elif stage == "new_filter_bank":
+        work, unit = channels, "channels/s"
+    else:
+        work, unit = frames * channels, "frames*channels/s"
+    return {
+        "case": case,
+        "stage": stage,
+        "engine": engine if stage == "compute_features" else None,
+        "wall_s": wall,
+        "peak_rss_mb": peak_rss / 2 ** 20,
+        "stage_rss_mb": (peak_rss - baseline_rss) / 2 ** 20,
+        "throughput": work / wall,
+        "throughput_unit": unit,
+        "counters": dict(recorder.counters),
+    }
+
+
+def measure_import(module: str, repeats: int = 1) -> dict:
+    """Cold import time of `module` in a fresh interpreter (best of `repeats`), and the heavy packages it loads."""
+    script = ("import sys, time; start = time.perf_counter(); import " + module + "; "
+              "print(time.perf_counter() - start); "
+              "print(' '.join(sorted({name.split('.')[0] for name in sys.modules})))")
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+        seconds, packages = output.splitlines()
+        timings.append(float(seconds))
+    packages = packages.split()
+    return {
+        "stage": "import",
+        "module": module,
+        "wall_s": min(timings),
+        "loads_matplotlib": "matplotlib" in packages,
+        "packages": [name for name in packages if name in ("matplotlib", "scipy", "numpy", "pandas", "sklearn")],
+    }
+
+
+def run_benchmarks(cases: list[dict], stages: tuple[str, ...] = STAGES, engines: tuple[str, ...] = ("default",),
+                   repeats: int = 1, isolate: bool = True, imports: tuple[str, ...] = ()) -> dict:
+    """Run every stage of every case, each in a fresh process when `isolate` is set, and time the `imports`."""
+    jobs = [(case, stage, engine) for case in cases for stage in stages
+            for engine in (engines if stage == "compute_features" else ("default",))]
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for case, stage, engine in jobs:
+        if isolate:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_stage, (case, stage, engine, repeats))
+        else:
+            result = run_stage(case, stage, engine, repeats)
+        print(f"[benchmarks] {stage:<17} {engine if stage == 'compute_features' else '':<9} {_label(case)} "
+              f"{result['wall_s']:.4f}s {result['peak_rss_mb']:.1f}MB "
+              f"{result['throughput']:.1f} {result['throughput_unit']}")
+        results.append(result)
+    import_results = []
+    for module in imports:
+        result = measure_import(module, repeats)
+        print(f"[benchmarks] import {module:<35} {result['wall_s']:.4f}s "
+              f"{'(loads matplotlib)' if result['loads_matplotlib'] else ''}")
+        import_results.append(result)
+    return {"metadata": _metadata(), "results": results, "imports": import_results}
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.1) -> list[str]:
+    """Stages of `current` that are more than `tolerance` slower, or use that much more memory, than `baseline`."""
+    def key(result):
+        return json.dumps([result["case"], result["stage"], result["engine"]], sort_keys=True)
+
+    reference = {key(result): result for result in baseline["results"]}
+    regressions = []
+    previous_imports = {result["module"]: result for result in baseline.get("imports", [])}
+    for result in current.get("imports", []):
+        previous = previous_imports.get(result["module"])
+        if previous is not None and result["wall_s"] > previous["wall_s"] * (1 + tolerance):
+            regressions.append(f"import {result['module']}: wall_s {previous['wall_s']:.4g} -> {result['wall_s']:.4g}")
+    for result in current["results"]:
+        previous = reference.get(key(result))
+        if previous is None:
+            continue
+        for metric in ("wall_s", "peak_rss_mb"):
+            if result[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{result['stage']} {result['engine'] or ''} {result['case']}: {metric} "
+                                   f"{previous[metric]:.4g} -> {result[metric]:.4g}")
+    return regressions
+
+
+def _label(case: dict) -> str:
+    return (f"{case['size_deg']}deg {case['time']}s@{case['fps']}fps {case['px_pitch']}deg/px "
+            f"{case['num_frequencies']}x{case['num_thetas']}ch")
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _metadata() -> dict:
+    import scipy
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[2.0, 5.0], help="stimulus size in degrees")
+    parser.add_argument("--durations", type=float, nargs="+", default=[0.5], help="stimulus duration in seconds")
+    parser.add_argument("--fps", type=float, nargs="+", default=[60.0])
+    parser.add_argument("--px-pitch", type=float, nargs="+", default=[0.02], help="degrees per pixel")
+    parser.add_argument("--num-frequencies", type=int, nargs="+", default=[3])
+    parser.add_argument("--num-thetas", type=int, nargs="+", default=[4])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=["default"])
+    parser.add_argument("--imports", nargs="*", default=list(IMPORT_MODULES),
+                        help="modules whose cold import time is measured (none with an empty list)")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files instead of running benchmarks")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown reported by --compare")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as baseline, open(args.compare[1]) as current:
+            regressions = compare(json.load(baseline), json.load(current), args.tolerance)
+        for regression in regressions:
+            print(f"[benchmarks] regression: {regression}")
+        return 1 if regressions else 0
+
+    cases = case_grid(args.sizes, args.durations, args.fps, args.px_pitch, args.num_frequencies, args.num_thetas)
+    report = run_benchmarks(cases, tuple(args.stages), tuple(args.engines), args.repeats, imports=tuple(args.imports))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Headless batch extraction of motion energy features from a YAML config.
+
+Usage:
+
+    motionenergy-extract config.yaml [--workers N] [--force]
+
+The config describes the stimuli, the filter bank, the engine options and where to write results:
+
+    stimulus:                 # drifting_sinusoidal.new_stimulus arguments shared by every stimulus
+      speed: 2.0              # deg/sec
+      size: [4.0, 4.0]        # degrees
+      theta_deg: 0.0
+      phase: 0.0
+      spatial_frequency: 2.0  # cycles/deg
+      amplitude: 1.0
+      time: 1.0               # sec
+      fps: 60.0
+    grid:                     # optional: cartesian product of stimulus parameters
+      theta_deg: [0, 45, 90, 135]
+      speed: [1.0, 2.0]
+    conditions:               # optional: explicit per-stimulus overrides, applied after the grid
+      - {speed: 4.0, theta_deg: 30.0}
+    filter_bank:
+      frequencies: [1.0, 2.0, 4.0]
+      thetas: [0, 45, 90, 135]
+      px_pitch: 0.02          # also the stimulus' pixel pitch
+    engine:                   # optional
+      dtype: float32          # float32 or float64
+      analytic: false
+      memory_budget: null     # bytes; stream each stimulus within this budget
+    output: features/         # directory; one stimulus-NNNN-<hash>.npz per stimulus
+    workers: 4                # optional; defaults to all cores
+
+Every stimulus is written atomically as soon as it is done, and stimuli already on disk are skipped
+unless --force is given. A file's name holds the stimulus' position and a hash of its stimulus, filter
+bank and engine settings, so editing the config computes the affected stimuli anew rather than
+reusing results for the old settings. The exit status is 0 if every stimulus succeeded, 1 if any failed and 2 if
+the config is invalid.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from time import perf_counter
+from typing import Any, NamedTuple, Optional
+
+import numpy as np
+
+STIMULUS_FIELDS = ("speed", "size", "theta_deg", "phase", "spatial_frequency", "amplitude", "time", "fps")
+ENGINE_FIELDS = ("dtype", "analytic", "memory_budget")
+DTYPES = {"float32": np.float32, "float64": np.float64}
+
+
+class ExtractionJob(NamedTuple):
+    index: int
+    stimulus: dict[str, Any]  # new_stimulus keyword arguments, without px_pitch
+    filter_bank: dict[str, Any]  # frequencies, thetas, px_pitch
+    engine: dict[str, Any]
+    path: Path
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def load_config(path: Path) -> dict[str, Any]:
+    import yaml
+
+    with open(path) as file:
+        try:
+            config = yaml.safe_load(file)
+        except yaml.YAMLError as error:
+            raise ConfigError(f"{path}: {error}") from error
+    if not isinstance(config, dict):
+        raise ConfigError(f"{path}: expected a mapping at the top level")
+    return config
+
+
+def expand_jobs(config: dict[str, Any]) -> list[ExtractionJob]:
+    """One job per stimulus described by `config`, validated."""
+    for section in ("stimulus", "filter_bank", "output"):
+        if section not in config:
+            raise ConfigError(f"missing required section {section!r}")
+    unknown = set(config) - {"stimulus", "grid", "conditions", "filter_bank", "engine", "output", "workers"}
+    if unknown:
+        raise ConfigError(f"unknown sections: {sorted(unknown)}")
+
+    base = dict(config["stimulus"])
+    grid = config.get("grid") or {}
+    if not isinstance(grid, dict) or not all(isinstance(values, list) for values in grid.values()):
+        raise ConfigError("grid must map stimulus parameters to lists of values")
+    if not isinstance(config.get("conditions") or [], list) or \
+            not all(isinstance(condition, dict) for condition in config.get("conditions") or []):
+        raise ConfigError("conditions must be a list of mappings")
+    for name in itertools.chain(base, grid, *(config.get("conditions") or [])):
+        if name not in STIMULUS_FIELDS:
+            raise ConfigError(f"unknown stimulus parameter {name!r}; expected one of {STIMULUS_FIELDS}")
+    stimuli = [{**base, **dict(zip(grid, values))} for values in itertools.product(*grid.values())] if grid else []
+    stimuli += [{**base, **condition} for condition in config.get("conditions") or []]
+    stimuli = stimuli or [base]
+    for stimulus in stimuli:
+        missing = [name for name in STIMULUS_FIELDS if name not in stimulus]
+        if missing:
+            raise ConfigError(f"stimulus {stimulus} is missing {missing}")
+        size = stimulus["size"]
+        if not isinstance(size, (list, tuple)) or len(size) != 2 or \
+                not all(isinstance(extent, (int, float)) and not isinstance(extent, bool) for extent in size):
+            raise ConfigError(f"stimulus size must be a [width, height] pair of numbers, got {size!r}")
+        stimulus["size"] = tuple(size)
+
+    filter_bank = dict(config["filter_bank"])
+    if set(filter_bank) != {"frequencies", "thetas", "px_pitch"}:
+        raise ConfigError("filter_bank needs exactly frequencies, thetas and px_pitch")
+    engine = dict(config.get("engine") or {})
+    if set(engine) - set(ENGINE_FIELDS):
+        raise ConfigError(f"unknown engine options {sorted(set(engine) - set(ENGINE_FIELDS))}")
+    if engine.get("dtype", "float64") not in DTYPES:
+        raise ConfigError(f"engine dtype must be one of {list(DTYPES)}")
+
+    output = Path(config["output"])
+    return [ExtractionJob(index, stimulus, filter_bank, engine,
+                          output / f"stimulus-{index:04d}-{_job_key(stimulus, filter_bank, engine)}.npz")
+            for index, stimulus in enumerate(stimuli)]
+
+
+def run_job(job: ExtractionJob) -> tuple[Path, float]:
+    """Generate one stimulus, extract its features and write them; returns the path and the seconds taken."""
+    from motionenergy import drifting_sinusoidal, energy
+
+    start = perf_counter()
+    bank = job.filter_bank
+    dtype = DTYPES[job.engine.get("dtype", "float64")]
+    analytic = bool(job.engine.get("analytic", False))
+    memory_budget = job.engine.get("memory_budget")
+    stimulus_args = [job.stimulus[name] for name in STIMULUS_FIELDS] + [bank["px_pitch"]]
+    if memory_budget is not None:
+        features = energy.stream_features(*stimulus_args, bank["frequencies"], bank["thetas"], int(memory_budget),
+                                          dtype=dtype, analytic=analytic)
+    else:
+        stimulus = drifting_sinusoidal.new_stimulus(*stimulus_args, dtype=dtype)
+        features = energy.compute_features(stimulus, bank["frequencies"], bank["thetas"], bank["px_pitch"],
+                                           dtype=dtype, analytic=analytic)
+
+    channels = np.array([(f, theta) for f in bank["frequencies"] for theta in bank["thetas"]], dtype=float)
+    description = _job_description(job.stimulus, bank, job.engine)
+    # write to a temporary file and rename it into place, so a result is either complete or absent
+    temporary = job.path.with_name(f".{job.path.stem}.{os.getpid()}.tmp.npz")
+    np.savez(temporary, features=features, channels=channels, config=description)
+    os.replace(temporary, job.path)
+    return job.path, perf_counter() - start
+
+
+def run_jobs(jobs: list[ExtractionJob], workers: Optional[int] = None, force: bool = False) -> int:
+    """Run the jobs whose results aren't on disk yet; returns the number of failed jobs."""
+    pending = [job for job in jobs if force or not job.path.exists()]
+    print(f"[motionenergy-extract] {len(jobs) - len(pending)} of {len(jobs)} stimuli already on disk")
+    for job in pending:
+        job.path.parent.mkdir(parents=True, exist_ok=True)
+
+    failures = 0
+    workers = workers or os.cpu_count() or 1
+
+    def report(done: int, job: ExtractionJob, outcome) -> None:
+        nonlocal failures
+        if isinstance(outcome, BaseException):
+            failures += 1
+            print(f"[motionenergy-extract] {done}/{len(pending)} FAILED {job.path.name}: {outcome!r}", file=sys.stderr)
+            traceback.print_exception(outcome, file=sys.stderr)
+        else:
+            path, seconds = outcome
+            print(f"[motionenergy-extract] {done}/{len(pending)} wrote {path.name} ({seconds:.2f}s)", flush=True)
+
+    if workers == 1:
+        for done, job in enumerate(pending, start=1):
+            try:
+                outcome = run_job(job)
+            except Exception as error:
+                outcome = error
+            report(done, job, outcome)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_job, job): job for job in pending}
+            for done, future in enumerate(as_completed(futures), start=1):
+                error = future.exception()
+                report(done, futures[future], error if error is not None else future.result())
+    return failures
+
+
+def _job_description(stimulus: dict[str, Any], filter_bank: dict[str, Any], engine: dict[str, Any]) -> str:
+    return json.dumps({"stimulus": stimulus, "filter_bank": filter_bank, "engine": engine}, sort_keys=True)
+
+
+def _job_key(stimulus: dict[str, Any], filter_bank: dict[str, Any], engine: dict[str, Any]) -> str:
+    return hashlib.sha256(_job_description(stimulus, filter_bank, engine).encode()).hexdigest()[:16]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="motionenergy-extract", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("config", type=Path, help="YAML config file")
+    parser.add_argument("--workers", type=int, help="worker processes; overrides the config")
+    parser.add_argument("--force", action="store_true", help="recompute stimuli that are already on disk")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(args.config)
+        jobs = expand_jobs(config)
+    except (OSError, ValueError) as error:
+        print(f"[motionenergy-extract] invalid config: {error}", file=sys.stderr)
+        return 2
+
+    start = perf_counter()
+    failures = run_jobs(jobs, args.workers or config.get("workers"), args.force)
+    print(f"[motionenergy-extract] finished in {perf_counter() - start:.2f}s, {failures} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""Batched population decoding of motion energy.
+
+Every function takes energy with the channel axis last, e.g. (trials, T, F) or the (T, F) output of
+``energy.compute_features``, and decodes all leading positions in one vectorised pass.
+
+The streaming decoders learn a linear readout from a stream of (features, label) minibatches via
+``partial_fit`` and never need the full feature table in memory, e.g. from
+``psychometric_analysis.iter_sweep_batches``. Their state can be saved and reloaded, so adding a
+condition to a sweep means feeding just its batches to the saved decoder instead of retraining.
+"""
+
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+class PopulationEstimate(NamedTuple):
+    """Decoded estimates, each with the shape of the energy without its channel axis."""
+    direction: NDArray[np.floating]  # degrees in [0, 360), or [0, 180) when decoded as axial
+    magnitude: NDArray[np.floating]  # length of the population vector
+    speed: Optional[NDArray[np.floating]]  # deg/sec, when channel speeds were given
+
+
+def population_vector(energy: NDArray[np.floating],
+                      channels: list[tuple[float, float]],
+                      axial: bool = False) -> tuple[NDArray[np.floating], NDArray[np.floating]]:
+    """Vector-sum decode of the preferred orientations of the channels, weighted by their energy.
+
+    The Gabor channels of ``gabor.new_filter_bank`` are purely spatial, so theta and theta + 180
+    respond identically; decode them with ``axial=True``, which sums on doubled angles and returns an
+    orientation in [0, 180).
+
+    Args:
+        energy: Energy with channels on the last axis
+        channels: (f, theta) of each channel, as returned by ``gabor.new_filter_bank``
+        axial: Treat the preferred angles as orientations rather than directions
+
+    Returns:
+        direction in degrees and the magnitude of the population vector
+    """
+    _check_channels(energy, channels)
+    angles = np.deg2rad([theta for _, theta in channels])
+    if axial:
+        angles = 2 * angles
+    x = energy @ np.cos(angles)
+    y = energy @ np.sin(angles)
+
+    direction = np.rad2deg(np.arctan2(y, x))
+    period = 360.0
+    if axial:
+        direction /= 2
+        period = 180.0
+    return np.mod(direction, period), np.hypot(x, y)
+
+
+def channel_speeds(channels: list[tuple[float, float]], temporal_frequency: float) -> NDArray[np.floating]:
+    """Preferred speed (deg/sec) of each channel when it is driven at `temporal_frequency` (cycles/sec).
+
+    v = f_t / f_s, as for the drifting gratings in ``drifting_sinusoidal``.
+    """
+    return temporal_frequency / np.array([f for f, _ in channels], dtype=float)
+
+
+def decode_speed(energy: NDArray[np.floating], preferred_speeds: NDArray[np.floating]) -> NDArray[np.floating]:
+    """Energy-weighted mean of the channels' preferred speeds, averaged in log-speed.
+
+    Positions with no energy at all decode to nan.
+    """
+    preferred_speeds = np.asarray(preferred_speeds, dtype=float)
+    if preferred_speeds.shape != (energy.shape[-1],):
+        raise ValueError(f"expected {energy.shape[-1]} preferred speeds, got shape {preferred_speeds.shape}")
+    total = energy.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.exp((energy @ np.log(preferred_speeds)) / total)
+
+
+def tuning_curve(energy: NDArray[np.floating],
+                 channels: list[tuple[float, float]]) -> tuple[NDArray[np.floating], NDArray[np.floating]]:
+    """Orientation tuning curve: energy summed over frequencies for each distinct theta.
+
+    Returns:
+        sorted distinct thetas and the tuning curve, of shape energy.shape[:-1] + (len(thetas),)
+    """
+    _check_channels(energy, channels)
+    thetas, theta_index = np.unique([theta for _, theta in channels], return_inverse=True)
+    membership = np.zeros((len(channels), len(thetas)))
+    membership[np.arange(len(channels)), theta_index] = 1.0
+    return thetas, energy @ membership
+
+
+def decode(energy: NDArray[np.floating],
+           channels: list[tuple[float, float]],
+           preferred_speeds: Optional[NDArray[np.floating]] = None,
+           axial: bool = False) -> PopulationEstimate:
+    """Decode direction, magnitude and (given per-channel preferred speeds) speed for every position."""
+    direction, magnitude = population_vector(energy, channels, axial=axial)
+    speed = decode_speed(energy, preferred_speeds) if preferred_speeds is not None else None
+    return PopulationEstimate(direction, magnitude, speed)
+
+
+class StreamingLeastSquares:
+    """Ridge regression from accumulated sufficient statistics.
+
+    ``partial_fit`` only adds each batch's X^T X and X^T Y (with an intercept column) to running sums,
+    so the fit after any sequence of batches is exactly the batch ridge solution over all of them.
+    """
+
+    def __init__(self, num_features: int, num_targets: int = 1, ridge: float = 1e-6):
+        self.ridge = ridge
+        self.gram = np.zeros((num_features + 1, num_features + 1))
+        self.moments = np.zeros((num_features + 1, num_targets))
+        self.num_samples = 0
+
+    def partial_fit(self, features: NDArray[np.floating], targets: NDArray[np.floating]) -> "StreamingLeastSquares":
+        design = _with_intercept(features)
+        targets = np.asarray(targets, dtype=float).reshape(len(design), -1)
+        self.gram += design.T @ design
+        self.moments += design.T @ targets
+        self.num_samples += len(design)
+        return self
+
+    @property
+    def coef(self) -> NDArray[np.floating]:
+        """(num_features + 1, num_targets) weights; the last row is the intercept."""
+        regularizer = self.ridge * np.eye(len(self.gram))
+        regularizer[-1, -1] = 0.0  # don't shrink the intercept
+        return np.linalg.solve(self.gram + regularizer, self.moments)
+
+    def predict(self, features: NDArray[np.floating]) -> NDArray[np.floating]:
+        return _with_intercept(features) @ self.coef
+
+    def save(self, path: Path) -> None:
+        np.savez(path, gram=self.gram, moments=self.moments, num_samples=self.num_samples, ridge=self.ridge)
+
+    @classmethod
+    def load(cls, path: Path) -> "StreamingLeastSquares":
+        with np.load(path) as data:
+            decoder = cls(len(data["gram"]) - 1, data["moments"].shape[1], float(data["ridge"]))
+            decoder.gram, decoder.moments = data["gram"], data["moments"]
+            decoder.num_samples = int(data["num_samples"])
+        return decoder
+
+
+class StreamingLogisticRegression:
+    """Multinomial logistic regression trained by minibatch gradient descent.
+
+    Inputs are standardized with running per-feature means and variances that are updated from every
+    batch before its gradient step.
+    """
+
+    def __init__(self, num_features: int, classes: list, learning_rate: float = 0.1, l2: float = 1e-4):
+        self.classes = np.asarray(classes)
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.weights = np.zeros((num_features + 1, len(self.classes)))
+        self.mean = np.zeros(num_features)
+        self.sum_sq = np.zeros(num_features)  # sum of squared deviations from the mean (Welford)
+        self.num_samples = 0
+
+    def partial_fit(self, features: NDArray[np.floating], labels: NDArray,
+                    epochs: int = 1) -> "StreamingLogisticRegression":
+        features = np.asarray(features, dtype=float)
+        self._update_scaling(features)
+        design = _with_intercept(self._standardize(features))
+        one_hot = (np.asarray(labels)[:, np.newaxis] == self.classes[np.newaxis, :]).astype(float)
+        if not one_hot.any(axis=1).all():
+            raise ValueError(f"labels must be one of {self.classes.tolist()}")
+        for _ in range(epochs):
+            gradient = design.T @ (_softmax(design @ self.weights) - one_hot) / len(design)
+            gradient[:-1] += self.l2 * self.weights[:-1]
+            self.weights -= self.learning_rate * gradient
+        return self
+
+    def predict_proba(self, features: NDArray[np.floating]) -> NDArray[np.floating]:
+        return _softmax(_with_intercept(self._standardize(np.asarray(features, dtype=float))) @ self.weights)
+
+    def predict(self, features: NDArray[np.floating]) -> NDArray:
+        return self.classes[self.predict_proba(features).argmax(axis=1)]
+
+    def save(self, path: Path) -> None:
+        np.savez(path, classes=self.classes, weights=self.weights, mean=self.mean, sum_sq=self.sum_sq,
+                 num_samples=self.num_samples, learning_rate=self.learning_rate, l2=self.l2)
+
+    @classmethod
+    def load(cls, path: Path) -> "StreamingLogisticRegression":
+        with np.load(path) as data:
+            decoder = cls(len(data["mean"]), data["classes"].tolist(), float(data["learning_rate"]), float(data["l2"]))
+            decoder.weights, decoder.mean, decoder.sum_sq = data["weights"], data["mean"], data["sum_sq"]
+            decoder.num_samples = int(data["num_samples"])
+        return decoder
+
+    def _update_scaling(self, features: NDArray[np.floating]) -> None:
+        # Chan et al.'s parallel update of the running mean and sum of squared deviations
+        batch_size = len(features)
+        batch_mean = features.mean(axis=0)
+        total = self.num_samples + batch_size
+        delta = batch_mean - self.mean
+        self.sum_sq += ((features - batch_mean) ** 2).sum(axis=0) + delta ** 2 * self.num_samples * batch_size / total
+        self.mean += delta * batch_size / total
+        self.num_samples = total
+
+    def _standardize(self, features: NDArray[np.floating]) -> NDArray[np.floating]:
+        scale = np.sqrt(self.sum_sq / max(self.num_samples, 1))
+        return (features - self.mean) / np.where(scale > 0, scale, 1.0)
+
+
+def orientation_targets(orientation_deg: NDArray[np.floating]) -> NDArray[np.floating]:
+    """Regression targets for an axial orientation: (cos 2 theta, sin 2 theta)."""
+    doubled = 2 * np.deg2rad(orientation_deg)
+    return np.stack([np.cos(doubled), np.sin(doubled)], axis=-1)
+
+
+def orientation_from_targets(targets: NDArray[np.floating]) -> NDArray[np.floating]:
+    """Inverse of `orientation_targets`: degrees in [0, 180)."""
+    return np.mod(np.rad2deg(np.arctan2(targets[..., 1], targets[..., 0])) / 2, 180.0)
+
+
+def _check_channels(energy: NDArray[np.floating], channels: list[tuple[float, float]]) -> None:
+    if energy.shape[-1] != len(channels):
+        raise ValueError(f"energy has {energy.shape[-1]} channels on its last axis but {len(channels)} were given")
+
+
+def _with_intercept(features: NDArray[np.floating]) -> NDArray[np.floating]:
+    features = np.asarray(features, dtype=float)
+    return np.hstack([features, np.ones((len(features), 1))])
+
+
+def _softmax(logits: NDArray[np.floating]) -> NDArray[np.floating]:
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
@@ -0,0 +1,92 @@
+"""Display-quantised (gamma-encoded integer) stimulus format."""
+
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+from numpy.typing import DTypeLike, NDArray
+
+
+@dataclass(frozen=True, eq=False)
+class DisplayStimulus:
+    """A stimulus stored as the integer frames a gamma-encoded display would show.
+
+    Codes map to stimulus values through
+
+        linear = (code / max_code) ** gamma
+        value = offset + amplitude * (2 * linear - 1)
+
+    i.e. the lowest code is ``offset - amplitude``, the highest ``offset + amplitude`` and the display
+    gamma is undone before the value is used. A uint8 stimulus is 8x smaller than its float64 source.
+
+    Attributes:
+        frames: Display codes of shape (T, H, W), uint8 or uint16
+        amplitude: Half the range of stimulus values spanned by the codes
+        offset: Stimulus value at mid-grey (linear luminance 0.5)
+        gamma: Display gamma the codes are encoded for
+    """
+    frames: NDArray[np.unsignedinteger]
+    amplitude: float
+    offset: float = 0.0
+    gamma: float = 2.2
+
+    def __post_init__(self):
+        if self.frames.dtype not in (np.uint8, np.uint16):
+            raise ValueError(f"display frames must be uint8 or uint16, got {self.frames.dtype}")
+        if self.frames.ndim != 3:
+            raise ValueError(f"display frames must have shape (T, H, W), got {self.frames.shape}")
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.frames.shape
+
+    @property
+    def max_code(self) -> int:
+        return int(np.iinfo(self.frames.dtype).max)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def decode_frame(self, index: int, out: NDArray[np.floating]) -> NDArray[np.floating]:
+        """Decode one frame into ``out`` (which may be a strided view) without large temporaries."""
+        np.multiply(self.frames[index], 1.0 / self.max_code, out=out, casting='unsafe')
+        np.power(out, self.gamma, out=out)
+        np.multiply(out, 2 * self.amplitude, out=out)
+        np.add(out, self.offset - self.amplitude, out=out)
+        return out
+
+    def decode(self, start: int = 0, stop: Optional[int] = None,
+               dtype: DTypeLike = np.float32) -> NDArray[np.floating]:
+        """Decode frames ``start:stop`` to float stimulus values."""
+        indices = range(*slice(start, stop).indices(len(self)))
+        decoded = np.empty((len(indices),) + self.shape[1:], dtype=dtype)
+        for i, index in enumerate(indices):
+            self.decode_frame(index, decoded[i])
+        return decoded
+
+
+def encode_frames(frames: Iterable[NDArray[np.floating]], num_frames: int, frame_shape: tuple[int, int],
+                  amplitude: float, offset: float = 0.0, gamma: float = 2.2,
+                  display_dtype: DTypeLike = np.uint8) -> DisplayStimulus:
+    """Quantise float frames onto a gamma-encoded integer display.
+
+    Frames are consumed one at a time so the float stimulus never has to exist as a whole.
+    Values outside ``offset +/- amplitude`` are clipped, as they would be on the display.
+    """
+    if amplitude <= 0:
+        raise ValueError(f"amplitude must be positive to encode a stimulus, got {amplitude}")
+    display_dtype = np.dtype(display_dtype)
+    codes = np.empty((num_frames,) + tuple(frame_shape), dtype=display_dtype)
+    max_code = np.iinfo(display_dtype).max
+    scratch = np.empty(frame_shape)
+    for index, frame in enumerate(frames):
+        # back to linear luminance in [0, 1], then gamma-encode
+        np.subtract(frame, offset, out=scratch)
+        scratch /= 2 * amplitude
+        scratch += 0.5
+        np.clip(scratch, 0.0, 1.0, out=scratch)
+        np.power(scratch, 1.0 / gamma, out=scratch)
+        scratch *= max_code
+        np.rint(scratch, out=scratch)
+        codes[index] = scratch
+    return DisplayStimulus(codes, amplitude, offset, gamma)
@@ -1,11 +1,11 @@
 import numpy as np
-from numpy.typing import NDArray
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from time import perf_counter
+from numpy.typing import DTypeLike, NDArray
+from contextlib import nullcontext
+from typing import Iterator, Optional, Union
+from motionenergy import instrumentation, memory_planner
+from motionenergy.display import DisplayStimulus, encode_frames
 
 
-# TODO: This function will crash the Jupyter kernel with large inputs - we need to optimize the memory
 def new_stimulus(
         speed: float,  # deg/sec,
         size: tuple[float, float],  # degrees of visual angle
@@ -16,19 +16,110 @@ def new_stimulus(
         time: float,  # sec
         fps: float,  # frames per second
         px_pitch: float,  # deg / pixel
-        log_clock_time: bool = False
-) -> NDArray[np.floating]:
+        log_clock_time: bool = False,
+        dtype: DTypeLike = np.float64,
+        display_dtype: Optional[DTypeLike] = None,
+        gamma: float = 2.2,
+        memory_budget: Optional[int] = None,
+) -> Union[NDArray[np.floating], DisplayStimulus]:
+    """
+    Generates a drifting sinusoidal grating of shape (T, X, Y).
+
+    With `memory_budget` (bytes), a MemoryError is raised before anything is allocated if the stimulus
+    would not fit; see ``memory_planner`` and ``iter_stimulus_chunks`` for streaming long stimuli.
+
+    With `display_dtype` set (np.uint8 or np.uint16) the grating is instead quantised frame by frame
+    onto a gamma-encoded display and returned as a `DisplayStimulus` spanning [-amplitude, amplitude];
+    the float volume is never materialised.
+
+    With `log_clock_time` a one-line timing summary is printed; use ``instrumentation.record`` to
+    collect the same timings and counters programmatically.
+    """
+    if memory_budget is not None:
+        estimate = memory_planner.estimate_memory(size, time, fps, px_pitch, [spatial_frequency], [theta_deg],
+                                                  dtype, display_dtype)
+        memory_planner.check_budget(estimate.new_stimulus_peak, memory_budget, "new_stimulus")
+    summary = instrumentation.log_summary("new_stimulus") if log_clock_time else nullcontext()
+    with summary, instrumentation.stage("new_stimulus"):
+        sinusoidal = _new_stimulus(speed, size, theta_deg, phase, spatial_frequency, amplitude, time, fps,
+                                   px_pitch, dtype, display_dtype, gamma)
+        frames = sinusoidal.frames if isinstance(sinusoidal, DisplayStimulus) else sinusoidal
+        instrumentation.count("frames", len(frames))
+        instrumentation.count("bytes_allocated", frames.nbytes)
+    return sinusoidal
+
+
+def _new_stimulus(speed: float, size: tuple[float, float], theta_deg: float, phase: float,
+                  spatial_frequency: float, amplitude: float, time: float, fps: float, px_pitch: float,
+                  dtype: DTypeLike, display_dtype: Optional[DTypeLike],
+                  gamma: float) -> Union[NDArray[np.floating], DisplayStimulus]:
     theta_rad = np.deg2rad(theta_deg)
-    start = 0.0
-    if log_clock_time:
-        start = perf_counter()
+    frames, x, y, f_s, f_t = _stimulus_geometry(speed, size, spatial_frequency, time, fps, px_pitch)
+    x_lim, y_lim = len(x), len(y)
+
+    if display_dtype is not None:
+        sinusoidal = encode_frames(
+            _sinusoidal_frames(x, y, theta_rad, amplitude, f_s, f_t, frames, phase),
+            frames,
+            (x_lim, y_lim),
+            amplitude,
+            gamma=gamma,
+            display_dtype=display_dtype,
+        )
+    else:
+        sinusoidal = sinusoidal_3d(
+            x,
+            y,
+            theta_rad,
+            amplitude,
+            f_s,
+            f_t,
+            frames,
+            phase,
+            dtype=dtype,
+        )
+    return sinusoidal
+
+
+def iter_stimulus_chunks(
+        speed: float,  # deg/sec,
+        size: tuple[float, float],  # degrees of visual angle
+        theta_deg: float,  # degrees
+        phase: float,  # radians
+        spatial_frequency: float,  # cycles/deg,
+        amplitude: float,
+        time: float,  # sec
+        fps: float,  # frames per second
+        px_pitch: float,  # deg / pixel
+        chunk_frames: int,
+        dtype: DTypeLike = np.float64,
+) -> Iterator[NDArray[np.floating]]:
+    """
+    Yields the stimulus of `new_stimulus` as consecutive chunks of at most `chunk_frames` frames.
+
+    Only one chunk is held at a time and its buffer is reused, so consumers must copy a chunk before
+    asking for the next one.
+    """
+    frames, x, y, f_s, f_t = _stimulus_geometry(speed, size, spatial_frequency, time, fps, px_pitch)
+    chunk = np.empty((min(chunk_frames, frames), len(x), len(y)), dtype=dtype)
+    filled = 0
+    for frame in _sinusoidal_frames(x, y, np.deg2rad(theta_deg), amplitude, f_s, f_t, frames, phase):
+        chunk[filled] = frame
+        filled += 1
+        if filled == len(chunk):
+            yield chunk
+            filled = 0
+    if filled:
+        yield chunk[:filled]
+
 
+def _stimulus_geometry(speed: float, size: tuple[float, float], spatial_frequency: float, time: float, fps: float,
+                       px_pitch: float) -> tuple[int, NDArray, NDArray, float, float]:
     # total number of frames
     frames = int(np.ceil(time * fps))
 
     px_per_degree = 1.0 / px_pitch
     x_lim, y_lim = int(np.ceil(size[0] * px_per_degree)), int(np.ceil(size[1] * px_per_degree))
-    print(f"Calculated width and height of stimulus in pixels as: {x_lim}, {y_lim}")
     x, y = np.arange(0, x_lim), np.arange(0, y_lim)
 
     nyquist_limit_spatial = 0.5 * px_per_degree
@@ -50,25 +141,14 @@ def new_stimulus(
     f_s = spatial_frequency * px_pitch
     # cycles / frame: sampled temporal frequency
     f_t = temporal_frequency / fps
-
-    sinusoidal = sinusoidal_3d(
-        x,
-        y,
-        theta_rad,
-        amplitude,
-        f_s,
-        f_t,
-        frames,
-        phase,
-    )
-    if log_clock_time:
-        end = perf_counter()
-        print(f"new_stimulus took {end-start:.6f}s | spatial_frequency={spatial_frequency}, fps={fps}, px_pitch={px_pitch}")
-    return sinusoidal
+    return frames, x, y, f_s, f_t
 
 
 def animate_stimulus(drifting_sinusodial: NDArray[np.floating], frames: int, fps: float, width_px: int, height_px: int,
                      dpi: int, title: str):
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
     fig, ax = plt.subplots(figsize=(width_px / dpi, height_px / dpi), dpi=dpi)
     im = ax.imshow(drifting_sinusodial[0], cmap='gray', origin='lower')
     fig.colorbar(im)
@@ -104,10 +184,39 @@ def sinusoidal_3d(
         f_t: float,  # cycle / frame
         frames: int,
         phase: float,  # dimensionless radians
+        dtype: DTypeLike = np.float64,
 ) -> NDArray[np.floating]:
-    f = np.arange(0, frames, 1)
-    # We use `ij` indexing here to keep the order of the dimensions
-    T, X, Y = np.meshgrid(f, x, y, indexing='ij')
-    X_rot = X * np.cos(theta) + Y * np.sin(theta)
-    sinusoidal = A * np.cos(2 * np.pi * f_s * X_rot - (2 * np.pi * f_t * T) + phase)
+    # The output keeps the `ij` order of the dimensions: (frames, len(x), len(y)).
+    # Phases are always computed in float64 and only the result is stored in `dtype`,
+    # so float32 stimuli don't lose precision at large T.
+    sinusoidal = np.empty((frames, len(x), len(y)), dtype=dtype)
+    for t, frame in enumerate(_sinusoidal_frames(x, y, theta, A, f_s, f_t, frames, phase)):
+        sinusoidal[t] = frame
     return sinusoidal
+
+
+def _sinusoidal_frames(
+        x: NDArray,
+        y: NDArray,
+        theta: float,  # radians
+        A: float,
+        f_s: float,  # cycle / px
+        f_t: float,  # cycle / frame
+        frames: int,
+        phase: float,  # dimensionless radians
+) -> Iterator[NDArray[np.floating]]:
+    """
+    Yields the frames of `sinusoidal_3d` one at a time. Rather than meshgridding the full (T, X, Y)
+    volume we build the spatial phase once and reuse a single float64 frame buffer, so consumers
+    must copy a frame before asking for the next one.
+    """
+    X, Y = np.meshgrid(x, y, indexing='ij')
+    X_rot = X * np.cos(theta) + Y * np.sin(theta)
+    spatial_phase = 2 * np.pi * f_s * X_rot
+    frame = np.empty_like(spatial_phase)
+    for t in range(frames):
+        np.subtract(spatial_phase, 2 * np.pi * f_t * t, out=frame)
+        frame += phase
+        np.cos(frame, out=frame)
+        frame *= A
+        yield frame
@@ -0,0 +1,151 @@
+"""Opt-in disk cache for ``energy.compute_features``.
+
+Entries are keyed on the stimulus (a hash of its buffer, or its generation parameters when the caller
+knows them), the filter bank and the engine options that affect the result. Each entry is one
+``.npy`` file written atomically, so readers in other processes see either the whole entry or none
+of it. The cache directory is kept under ``max_bytes`` by evicting the least recently used entries;
+eviction holds an exclusive lock on the directory so concurrent workers don't race on it. Hits
+refresh an entry's modification time, which is what "recently used" is measured by.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+import numpy as np
+from numpy.typing import DTypeLike, NDArray
+
+from motionenergy import energy, instrumentation
+from motionenergy.display import DisplayStimulus
+
+# bump when a change to the pipeline changes its output, to invalidate existing entries
+CACHE_VERSION = 1
+_LOCK = ".lock"
+
+
+class FeatureCache:
+    def __init__(self, directory: Path, max_bytes: int = 2 ** 30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def compute_features(self, stimulus: Union[NDArray[np.floating], DisplayStimulus], frequencies: list[float],
+                         thetas: list[float], px_pitch: float = 0.02,
+                         stimulus_params: Optional[dict[str, Any]] = None,
+                         out: Optional[NDArray[np.floating]] = None, dtype: Optional[DTypeLike] = None,
+                         analytic: bool = False, **options) -> NDArray[np.floating]:
+        """``energy.compute_features`` through the cache.
+
+        Args:
+            stimulus, frequencies, thetas, px_pitch, out, dtype, analytic: as for ``energy.compute_features``
+            stimulus_params: Parameters that fully determine the stimulus (e.g. the ``new_stimulus``
+                arguments). When given they are hashed instead of the stimulus buffer.
+            options: Passed through to ``energy.compute_features`` on a miss; these (``workspace``,
+                ``memory_budget``, ``verbose``) don't change the result and aren't part of the key.
+        """
+        if dtype is None:
+            is_single = isinstance(stimulus, DisplayStimulus) or stimulus.dtype == np.float32
+            dtype = np.float32 if is_single else np.float64
+        key = self.key(stimulus, frequencies, thetas, px_pitch, np.dtype(dtype), analytic, stimulus_params)
+
+        features = self._load(key)
+        if features is not None:
+            self.hits += 1
+            instrumentation.count("cache_hits")
+            if out is None:
+                return features
+            out[...] = features
+            return out
+
+        self.misses += 1
+        instrumentation.count("cache_misses")
+        features = energy.compute_features(stimulus, frequencies, thetas, px_pitch, out=out, dtype=dtype,
+                                           analytic=analytic, **options)
+        self._store(key, features)
+        return features
+
+    def key(self, stimulus: Union[NDArray[np.floating], DisplayStimulus], frequencies: list[float],
+            thetas: list[float], px_pitch: float, dtype: np.dtype, analytic: bool,
+            stimulus_params: Optional[dict[str, Any]] = None) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps({
+            "version": CACHE_VERSION,
+            "frequencies": [float(f) for f in frequencies],
+            "thetas": [float(theta) for theta in thetas],
+            "px_pitch": px_pitch,
+            "dtype": dtype.str,
+            "analytic": analytic,
+            "stimulus_params": stimulus_params,
+        }, sort_keys=True).encode())
+        if stimulus_params is None:
+            _hash_stimulus(digest, stimulus)
+        return digest.hexdigest()
+
+    def size_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def clear(self) -> None:
+        with self._locked():
+            for entry in self._entries():
+                entry.unlink(missing_ok=True)
+
+    def _load(self, key: str) -> Optional[NDArray[np.floating]]:
+        path = self.directory / f"{key}.npy"
+        try:
+            features = np.load(path)
+            os.utime(path)
+        except FileNotFoundError:  # never stored, or evicted by another process
+            return None
+        return features
+
+    def _store(self, key: str, features: NDArray[np.floating]) -> None:
+        if features.nbytes > self.max_bytes:
+            return
+        path = self.directory / f"{key}.npy"
+        temporary = self.directory / f".{key}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            np.save(file, features)
+        os.replace(temporary, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._locked():
+            entries = []
+            for entry in self._entries():
+                try:
+                    entries.append((entry.stat().st_mtime, entry.stat().st_size, entry))
+                except FileNotFoundError:
+                    continue
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                entry.unlink(missing_ok=True)
+                total -= size
+
+    def _entries(self) -> Iterator[Path]:
+        return self.directory.glob("*.npy")
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(self.directory / _LOCK, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _hash_stimulus(digest: "hashlib.blake2b", stimulus: Union[NDArray[np.floating], DisplayStimulus]) -> None:
+    if isinstance(stimulus, DisplayStimulus):
+        digest.update(json.dumps([stimulus.amplitude, stimulus.offset, stimulus.gamma]).encode())
+        stimulus = stimulus.frames
+    digest.update(f"{stimulus.dtype.str}{stimulus.shape}".encode())
+    # hash the buffer in place; only non-contiguous stimuli are copied
+    digest.update(memoryview(np.ascontiguousarray(stimulus)).cast("B"))
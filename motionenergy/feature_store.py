@@ -0,0 +1,172 @@
+"""Append-only on-disk store of motion energy features with channel metadata.
+
+A store is a directory:
+
+    manifest.json         channel metadata (f, theta), px_pitch and dtype
+    conditions.jsonl      one record per condition, appended as conditions are added
+    chunk-000000.bin      features of condition 0, channel-major: shape (F, T)
+    chunk-000001.bin      ...
+
+Every appended condition becomes one chunk, stored channel by channel so that each channel's time
+series is contiguous on disk. Reads memory-map the chunks, so reading a few channels or a time range
+only touches those bytes. A condition's record holds its stimulus parameters, the engine options
+and a provenance hash of everything that determined its features; it is appended only after its
+chunk is completely written, so a store never refers to a partial chunk (and a record cut short by
+a crash is ignored). A store supports one writer at a time and any number of readers.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from numpy.typing import DTypeLike, NDArray
+
+from motionenergy import __version__
+
+MANIFEST = "manifest.json"
+CONDITIONS = "conditions.jsonl"
+FORMAT_VERSION = 1
+
+
+def provenance_hash(stimulus: dict[str, Any], channels: list[tuple[float, float]], px_pitch: float,
+                    engine: Optional[dict[str, Any]] = None) -> str:
+    """Hash of everything that determines a condition's features, including the package version."""
+    description = json.dumps({
+        "stimulus": stimulus,
+        "channels": [list(channel) for channel in channels],
+        "px_pitch": px_pitch,
+        "engine": engine or {},
+        "version": __version__,
+    }, sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+class FeatureStore:
+    """Features of many conditions over one filter bank.
+
+    Create a store with `FeatureStore.create`, open an existing one with `FeatureStore(path)`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / MANIFEST) as file:
+            manifest = json.load(file)
+        if manifest["version"] != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: unsupported feature store version {manifest['version']}")
+        self.channels: list[tuple[float, float]] = [tuple(channel) for channel in manifest["channels"]]
+        self.px_pitch: float = manifest["px_pitch"]
+        self.dtype = np.dtype(manifest["dtype"])
+        self.conditions: list[dict[str, Any]] = []
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Pick up conditions appended since the store was opened, e.g. by another process."""
+        with open(self.path / CONDITIONS) as file:
+            lines = file.read().split("\n")
+        # the last element is either empty or a record whose write was cut short
+        self.conditions = [json.loads(line) for line in lines[:-1]]
+
+    @classmethod
+    def create(cls, path: Path, channels: list[tuple[float, float]], px_pitch: float,
+               dtype: DTypeLike = np.float64) -> "FeatureStore":
+        """Create an empty store for features of `channels` (in column order, e.g. ``workspace.channels``)."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        if (path / MANIFEST).exists():
+            raise FileExistsError(f"{path} already holds a feature store")
+        (path / CONDITIONS).touch()
+        temporary = path / f".{MANIFEST}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "channels": [[float(f), float(theta)] for f, theta in channels],
+                "px_pitch": px_pitch,
+                "dtype": np.dtype(dtype).str,
+            }, file, indent=1)
+        os.replace(temporary, path / MANIFEST)
+        return cls(path)
+
+    @property
+    def num_channels(self) -> int:
+        return len(self.channels)
+
+    def append(self, features: NDArray[np.floating], stimulus: dict[str, Any],
+               engine: Optional[dict[str, Any]] = None) -> int:
+        """Add the (T, F) features of one condition; returns its condition index.
+
+        Args:
+            features: output of ``energy.compute_features`` over this store's channels
+            stimulus: parameters of the stimulus, e.g. the ``new_stimulus`` arguments (JSON-serialisable)
+            engine: ``compute_features`` options that affect the features, e.g. {"analytic": True}
+        """
+        if features.ndim != 2 or features.shape[1] != self.num_channels:
+            raise ValueError(f"features must have shape (T, {self.num_channels}), got {features.shape}")
+        self.refresh()
+        _drop_partial_record(self.path / CONDITIONS)
+        index = len(self.conditions)
+        chunk = f"chunk-{index:06d}.bin"
+        # write the chunk under a temporary name first; records only ever refer to complete chunks
+        temporary = self.path / f".{chunk}.{os.getpid()}.tmp"
+        np.ascontiguousarray(features.T, dtype=self.dtype).tofile(temporary)
+        os.replace(temporary, self.path / chunk)
+
+        record = {
+            "chunk": chunk,
+            "num_frames": len(features),
+            "stimulus": stimulus,
+            "engine": engine or {},
+            "provenance": provenance_hash(stimulus, self.channels, self.px_pitch, engine),
+        }
+        with open(self.path / CONDITIONS, "a") as file:
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.conditions.append(record)
+        return index
+
+    def channel_indices(self, frequencies: Optional[list[float]] = None,
+                        thetas: Optional[list[float]] = None) -> list[int]:
+        """Columns of the channels with one of `frequencies` and one of `thetas` (all if None)."""
+        return [i for i, (f, theta) in enumerate(self.channels)
+                if (frequencies is None or f in frequencies) and (thetas is None or theta in thetas)]
+
+    def find(self, **stimulus) -> list[int]:
+        """Indices of the conditions whose stimulus parameters include all of the given values."""
+        return [i for i, record in enumerate(self.conditions)
+                if all(record["stimulus"].get(name) == value for name, value in stimulus.items())]
+
+    def column_map(self, condition: int) -> np.memmap:
+        """Read-only (F, T) memory map of one condition's features."""
+        record = self.conditions[condition]
+        return np.memmap(self.path / record["chunk"], dtype=self.dtype, mode="r",
+                         shape=(self.num_channels, record["num_frames"]))
+
+    def read(self, condition: int, channels: Optional[list[int]] = None,
+             frames: slice = slice(None)) -> NDArray[np.floating]:
+        """(T', C') features of one condition, reading only the requested channels and frames from disk."""
+        columns = self.column_map(condition)
+        channels = range(self.num_channels) if channels is None else channels
+        return np.stack([columns[channel, frames] for channel in channels], axis=-1)
+
+    def read_many(self, conditions: Optional[list[int]] = None, channels: Optional[list[int]] = None,
+                  frames: slice = slice(None)) -> NDArray[np.floating]:
+        """(N, T', C') features of several conditions; the selected frame ranges must have equal lengths."""
+        conditions = range(len(self.conditions)) if conditions is None else conditions
+        return np.stack([self.read(condition, channels, frames) for condition in conditions])
+
+    def verify(self, condition: int) -> bool:
+        """Whether a condition's recorded provenance matches its parameters under the current package version."""
+        record = self.conditions[condition]
+        return record["provenance"] == provenance_hash(record["stimulus"], self.channels, self.px_pitch,
+                                                       record["engine"])
+
+
+def _drop_partial_record(path: Path) -> None:
+    # truncate a trailing record whose write was cut short, so the next record starts on its own line
+    with open(path, "rb+") as file:
+        content = file.read()
+        if content and not content.endswith(b"\n"):
+            file.truncate(content.rfind(b"\n") + 1)
@@ -0,0 +1,171 @@
+"""Foveated front-end for ``compute_features``.
+
+A ``FoveatedGrid`` splits the visual field around a fixation point into rings: ring 0 is the fovea,
+a disc of radius ``fovea_radius``, and ring l > 0 covers eccentricities [fovea_radius * 2**(l - 1),
+fovea_radius * 2**l), the last ring extending to the edge of the frame. Ring l is sampled at 2**l
+times the stimulus' pixel pitch, by repeatedly averaging 2x2 blocks of the frame, and only the
+square that bounds the ring is filtered. Each ring therefore holds about as many pixels as the fovea,
+instead of growing with the square of the eccentricity.
+
+The filter bank is applied to every ring with the same kernels in pixels, so in degrees a channel's
+receptive field doubles, and its preferred spatial frequency halves, with every ring (see
+``ring_frequencies``). Energies are pooled separately within each ring.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from motionenergy import utils
+from motionenergy.energy import EnergyWorkspace
+
+
+class FoveatedGrid(NamedTuple):
+    frame_shape: tuple[int, int]  # pixels of the full-resolution frame
+    px_pitch: float  # deg / pixel of the full-resolution frame
+    fovea_radius: float  # deg
+    num_rings: int
+    fixation: tuple[float, float]  # (row, column) of the fixation point, full-resolution pixels
+
+
+def new_grid(frame_shape: tuple[int, int], px_pitch: float, fovea_radius: float,
+             fixation: Optional[tuple[float, float]] = None) -> FoveatedGrid:
+    """A grid with as many rings as it takes to reach the frame's farthest corner from fixation."""
+    if fixation is None:
+        fixation = ((frame_shape[0] - 1) / 2, (frame_shape[1] - 1) / 2)
+    corners = [(row, column) for row in (0, frame_shape[0] - 1) for column in (0, frame_shape[1] - 1)]
+    max_eccentricity = max(np.hypot(row - fixation[0], column - fixation[1]) for row, column in corners) * px_pitch
+    num_rings = 1 + max(0, int(np.ceil(np.log2(max_eccentricity / fovea_radius))))
+    return FoveatedGrid(tuple(frame_shape), px_pitch, fovea_radius, num_rings, fixation)
+
+
+def display_grid(frame_shape: tuple[int, int], viewing_distance_cm: float, monitor_resolution: tuple[int, int],
+                 monitor_diagonal_inches: float, fovea_radius: float,
+                 fixation: Optional[tuple[float, float]] = None) -> FoveatedGrid:
+    """A grid for a stimulus shown on a monitor, with the pixel pitch of ``utils.pixel_pitch``."""
+    px_pitch, _ = utils.pixel_pitch(viewing_distance_cm, monitor_resolution, monitor_diagonal_inches)
+    return new_grid(frame_shape, px_pitch, fovea_radius, fixation)
+
+
+def ring_bounds(grid: FoveatedGrid, ring: int) -> tuple[float, float]:
+    """Inner and outer eccentricity of a ring in degrees; the last ring is unbounded."""
+    inner = 0.0 if ring == 0 else grid.fovea_radius * 2 ** (ring - 1)
+    outer = np.inf if ring == grid.num_rings - 1 else grid.fovea_radius * 2 ** ring
+    return inner, outer
+
+
+def ring_frequencies(frequencies: list[float], ring: int) -> list[float]:
+    """Spatial frequencies (cycles/deg) that the bank's channels prefer within `ring`."""
+    return [f / 2 ** ring for f in frequencies]
+
+
+def resample(frame: NDArray[np.floating], grid: FoveatedGrid) -> list[NDArray[np.floating]]:
+    """The part of `frame` each ring filters, at that ring's resolution."""
+    crops = []
+    level = frame
+    for ring in range(grid.num_rings):
+        if ring > 0:
+            level = _downsample(level)
+        crops.append(level[_crop(grid, ring, level.shape)])
+    return crops
+
+
+def pixel_count(grid: FoveatedGrid) -> int:
+    """Pixels filtered per frame over all rings, against frame_shape[0] * frame_shape[1] without foveation."""
+    count = 0
+    for ring in range(grid.num_rings):
+        level_shape = tuple(size // 2 ** ring for size in grid.frame_shape)  # as left by `_downsample`
+        crop = _crop(grid, ring, level_shape)
+        count += int(np.prod([len(range(*bounds.indices(size))) for bounds, size in zip(crop, level_shape)]))
+    return count
+
+
+def foveated_features(stimulus: NDArray[np.floating], frequencies: list[float], thetas: list[float],
+                      grid: FoveatedGrid) -> NDArray[np.floating]:
+    """Motion energy of every channel pooled within every ring of the grid.
+
+    Args:
+        stimulus: (T, H, W) stimulus with H, W = grid.frame_shape, sampled at grid.px_pitch
+        frequencies, thetas: the filter bank, designed at the full-resolution pitch; within ring l a
+            channel prefers f / 2**l (``ring_frequencies``)
+        grid: from `new_grid` or `display_grid`
+
+    Returns:
+        energy of shape (T, num_rings, len(frequencies) * len(thetas)), channels in bank order
+    """
+    if stimulus.shape[1:] != grid.frame_shape:
+        raise ValueError(f"stimulus frames have shape {stimulus.shape[1:]}, the grid expects {grid.frame_shape}")
+    dtype = np.float32 if stimulus.dtype == np.float32 else np.float64
+    crops = resample(stimulus[0], grid)
+    workspaces = []
+    masks = []
+    for ring, crop in enumerate(crops):
+        workspace = EnergyWorkspace()
+        workspace.prepare(crop.shape, frequencies, thetas, grid.px_pitch, dtype)
+        workspaces.append(workspace)
+        masks.append([_ring_weights(grid, ring, workspace, region) for region in workspace.valid_regions])
+
+    energy = np.empty((len(stimulus), grid.num_rings, len(frequencies) * len(thetas)))
+    for frame_idx, frame in enumerate(stimulus):
+        for ring, (crop, workspace) in enumerate(zip(resample(frame, grid), workspaces)):
+            workspace.load_frame(crop)
+            for filter_idx, weights in enumerate(masks[ring]):
+                workspace.unique_energy[filter_idx] = np.vdot(weights, workspace.local_energy(filter_idx))
+            np.take(workspace.unique_energy, workspace.inverse, out=energy[frame_idx, ring])
+    return energy
+
+
+def pool_rings(energy: NDArray[np.floating], grid: FoveatedGrid) -> NDArray[np.floating]:
+    """Average (T, num_rings, F) ring energies into (T, F), weighting each ring by its area in the frame."""
+    rows, columns = np.indices(grid.frame_shape)
+    eccentricity = np.hypot(rows - grid.fixation[0], columns - grid.fixation[1]) * grid.px_pitch
+    areas = np.array([np.count_nonzero((inner <= eccentricity) & (eccentricity < outer))
+                      for inner, outer in (ring_bounds(grid, ring) for ring in range(grid.num_rings))], dtype=float)
+    return np.einsum("trf,r->tf", energy, areas / areas.sum())
+
+
+def _downsample(image: NDArray[np.floating]) -> NDArray[np.floating]:
+    # mean of 2x2 blocks; an odd last row or column is dropped
+    rows, columns = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    return image[:rows:2, :columns:2] / 4 + image[1:rows:2, :columns:2] / 4 + \
+        image[:rows:2, 1:columns:2] / 4 + image[1:rows:2, 1:columns:2] / 4
+
+
+def _ring_fixation(grid: FoveatedGrid, ring: int) -> tuple[float, float]:
+    # level pixel i averages full-resolution pixels 2i and 2i + 1, so x_l = (x_{l-1} - 0.5) / 2
+    scale = 2 ** ring
+    return tuple((x + 0.5) / scale - 0.5 for x in grid.fixation)
+
+
+def _crop(grid: FoveatedGrid, ring: int, level_shape: tuple[int, int]) -> tuple[slice, slice]:
+    # the square bounding the ring's outer circle, clipped to the level image
+    _, outer = ring_bounds(grid, ring)
+    if np.isinf(outer):
+        return slice(None), slice(None)
+    radius = int(np.ceil(outer / (grid.px_pitch * 2 ** ring))) + 1
+    centre = _ring_fixation(grid, ring)
+    return tuple(slice(max(0, int(np.floor(c)) - radius), min(size, int(np.floor(c)) + radius + 2))
+                 for c, size in zip(centre, level_shape))
+
+
+def _ring_weights(grid: FoveatedGrid, ring: int, workspace: EnergyWorkspace,
+                  region: tuple[slice, slice]) -> NDArray[np.floating]:
+    # uniform weights over the valid-region pixels that lie inside both the crop and the ring
+    level_shape = tuple(size // 2 ** ring for size in grid.frame_shape)
+    crop = _crop(grid, ring, level_shape)
+    inner, outer = ring_bounds(grid, ring)
+    centre = _ring_fixation(grid, ring)
+    coordinates = []
+    for axis, valid in enumerate(region):
+        size = valid.stop - valid.start
+        offset = (size - workspace.frame_shape[axis]) // 2  # the map starts this far before the crop
+        in_crop = np.arange(size) - offset
+        inside = (in_crop >= 0) & (in_crop < workspace.frame_shape[axis])
+        level = in_crop + (crop[axis].start or 0)
+        coordinates.append((level - centre[axis], inside))
+    (row_offsets, row_inside), (column_offsets, column_inside) = coordinates
+    eccentricity = np.hypot(row_offsets[:, np.newaxis], column_offsets[np.newaxis, :]) * grid.px_pitch * 2 ** ring
+    mask = (eccentricity >= inner) & (eccentricity < outer) & row_inside[:, np.newaxis] & column_inside[np.newaxis, :]
+    weights = mask.astype(workspace.dtype)
+    return weights / max(mask.sum(), 1)
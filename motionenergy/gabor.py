@@ -1,36 +1,102 @@
 import numpy as np
-from numpy.typing import NDArray
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+from numpy.typing import DTypeLike, NDArray
+from motionenergy import instrumentation
 
 
-def new_filter_bank(frequencies: list[float], thetas: list[float], px_pitch: float) -> tuple[list[list[NDArray[np.floating]]], list[list[tuple[float, float]]]]:
+def new_filter_bank(frequencies: list[float], thetas: list[float], px_pitch: float,
+                    dtype: DTypeLike = np.float64) -> tuple[list[list[NDArray[np.floating]]], list[list[tuple[float, float]]]]:
     """
     Returns a numpy array of dimension 2 x F, where F is the cartesian product of |frequencies x thetas|
     This function constructs a spatio-temporal Gabor filter for each spatial frequency, orientation,
     and organizes the returned array in terms of the two phases: 0 and np.pi/2 to make downstream
     motion energy computation on the quadrature pair easy.
+
+    Only one quadrature pair per frequency is built from scratch for each group of orientations related
+    by symmetry; the others are derived from it (see `_derive_quadrature_pair`). Derived kernels may be
+    views of, or share memory with, another channel's kernel.
+
+    Kernels are built and normalized in float64 and only then cast to `dtype`.
     """
-    phases = [0, np.pi / 2]
     kernels = [[], []]  # two phases - quadrature pairs
     channels = [[], []]
-    for (i, phase) in enumerate(phases):
-        for (j, f) in enumerate(frequencies):
-            for (k, theta) in enumerate(thetas):
-                filter = new_spatial_filter(theta, phase, f, px_pitch)
-                kernels[i].append(filter)
-                channels[i].append((f, theta))
+    with instrumentation.stage("new_filter_bank"):
+        for f in frequencies:
+            pairs = {}  # orientation (mod 360) -> normalized quadrature pair at this frequency
+            for theta in thetas:
+                key = _orientation_key(theta, 360.0)
+                if key not in pairs:
+                    pairs[key] = _derive_quadrature_pair(theta, pairs)
+                    if pairs[key] is None:
+                        pairs[key] = _new_quadrature_pair(theta, f, px_pitch, dtype)
+                        instrumentation.count("bytes_allocated", pairs[key][0].nbytes + pairs[key][1].nbytes)
+                even, odd = pairs[key]
+                for i, kernel in enumerate((even, odd)):
+                    kernels[i].append(kernel)
+                    channels[i].append((f, theta))
+
+    return kernels, channels
+
+
+def unique_channels(channels: list[tuple[float, float]]) -> tuple[list[int], NDArray[np.intp]]:
+    """
+    Groups the (f, theta) channels of a filter bank by the energy they produce.
+
+    A channel at theta + 180 has the same even kernel and a negated odd kernel as the channel at theta,
+    so its quadrature energy is identical.
+
+    Returns:
+        - indices into `channels` of one representative per group, in order of first appearance
+        - for every channel, the position of its representative in that list
+    """
+    representatives = []
+    inverse = np.empty(len(channels), dtype=np.intp)
+    seen = {}
+    for i, (f, theta) in enumerate(channels):
+        key = (f, _orientation_key(theta, 180.0))
+        if key not in seen:
+            seen[key] = len(representatives)
+            representatives.append(i)
+        inverse[i] = seen[key]
+    return representatives, inverse
+
+
+def _new_quadrature_pair(theta: float, f: float, px_pitch: float,
+                         dtype: DTypeLike) -> tuple[NDArray[np.floating], NDArray[np.floating]]:
+    even = new_spatial_filter(theta, 0, f, px_pitch)
+    odd = new_spatial_filter(theta, np.pi / 2, f, px_pitch)
 
     # Normalize each quadrature pair so that their combined energy (i.e L2 norm) is 1
     # we want each filter to contribute equally.
-    for i in range(len(kernels[0])):
-        even = kernels[0][i]
-        odd = kernels[1][i]
-        norm = np.sqrt((even ** 2 + odd ** 2).sum())
-        kernels[0][i] /= norm
-        kernels[1][i] /= norm
+    norm = np.sqrt((even ** 2 + odd ** 2).sum())
+    even /= norm
+    odd /= norm
+    return even.astype(dtype, copy=False), odd.astype(dtype, copy=False)
 
-    return kernels, channels
+
+def _derive_quadrature_pair(theta: float, pairs: dict) -> tuple[NDArray[np.floating], NDArray[np.floating]] | None:
+    """
+    Derives the pair at `theta` from an already built pair at the same frequency, if there is a related one.
+    On the square, centred kernel grid:
+        - theta + 180 keeps the even kernel (it's point-symmetric) and negates the odd one
+        - theta + 90 is the kernel rotated by 90 degrees (a transpose and a flip)
+        - 90 - theta is the transposed kernel (a reflection about the diagonal)
+    The DC removal and the normalization are invariant under all three, so the results are exact.
+    """
+    half_turn = pairs.get(_orientation_key(theta - 180.0, 360.0))
+    if half_turn is not None:
+        return half_turn[0], -half_turn[1]
+    quarter_turn = pairs.get(_orientation_key(theta - 90.0, 360.0))
+    if quarter_turn is not None:
+        return np.rot90(quarter_turn[0], -1), np.rot90(quarter_turn[1], -1)
+    reflection = pairs.get(_orientation_key(90.0 - theta, 360.0))
+    if reflection is not None:
+        return reflection[0].T, reflection[1].T
+    return None
+
+
+def _orientation_key(theta: float, period: float) -> float:
+    # round so that e.g. 22.5 * 8 and 180.0 land on the same key
+    return round(theta % period, 9) % period
 
 
 def new_spatial_filter(
@@ -39,6 +105,7 @@ def new_spatial_filter(
         f_s: float,  # cycle / deg
         pixel_pitch: float,  # deg / px
         n_sigmas: float = 3.0,
+        dtype: DTypeLike = np.float64,
 ) -> NDArray[np.floating]:
     """
     f_s: number of cycles of visual degree (cycle/deg). this gets converted to (cycle/px) when generating the filter
@@ -50,15 +117,14 @@ def new_spatial_filter(
         - A normalized Gabor kernel
     """
     theta_rad = np.deg2rad(theta_deg)
-    # TODO: Understand how bandwidth plays a role in this sigma calculation. I'm currently using a rule of thumb
-    sigma_deg = 0.5 / f_s
+    sigma_deg = _sigma_deg(f_s)
 
     # Pixel pitch refers to the number of visual degrees spanned by a single pixel. In the below calculation,
     # sigma is the spread in degrees, pixel_pitch is in degrees/pixel. We are quantizing the visual degrees by the
     # pixel_pitch of the monitor we have - determining how many pixels will be used to cover 3*spread (95%+ of the gaussian)
     # Once we create the coordinate lattice, we return it back to units of degrees so we have a grid of degrees that are one
     # pixel apart.
-    radius_px = max(1, int(np.ceil(n_sigmas * sigma_deg / pixel_pitch)))
+    radius_px = kernel_radius_px(f_s, pixel_pitch, n_sigmas)
     coords_deg = np.arange(-radius_px, radius_px + 1) * pixel_pitch  # coordinate system in degrees
     X, Y = np.meshgrid(coords_deg, coords_deg)
 
@@ -73,7 +139,80 @@ def new_spatial_filter(
     # We want to remove the DC component (0Hz) from the kernel so that when we convolve it
     # with a flat image we don't produce non-zero response everywhere.
     kernel -= kernel.mean()
-    return kernel / np.linalg.norm(kernel)
+    return (kernel / np.linalg.norm(kernel)).astype(dtype, copy=False)
+
+
+def kernel_radius_px(f_s: float, pixel_pitch: float, n_sigmas: float = 3.0) -> int:
+    """
+    Half-width in pixels of the spatial kernel `new_spatial_filter` builds for `f_s` (the kernel is 2 * radius + 1 wide).
+    """
+    return max(1, int(np.ceil(n_sigmas * _sigma_deg(f_s) / pixel_pitch)))
+
+
+def _sigma_deg(f_s: float) -> float:
+    # TODO: Understand how bandwidth plays a role in this sigma calculation. I'm currently using a rule of thumb
+    return 0.5 / f_s
+
+
+def new_transfer_function(
+        theta_deg: float,  # degrees
+        f_s: float,  # cycle / deg
+        pixel_pitch: float,  # deg / px
+        fft_shape: tuple[int, int],
+) -> NDArray[np.complexfloating]:
+    """
+    Builds the quadrature pair of a Gabor channel directly on an rfft grid, without a spatial kernel.
+
+    A Gabor's Fourier transform is a pair of Gaussians centred on +/- its carrier frequency:
+        even (phase 0):      (G(k - k0) + G(k + k0)) / 2
+        odd (phase pi / 2):  i * (G(k - k0) - G(k + k0)) / 2
+    with G(k) = exp(-2 pi^2 sigma^2 |k|^2). The spectra are those of kernels centred on the origin of the grid,
+    i.e. untruncated versions of `new_spatial_filter`'s kernels (no n_sigmas cut-off).
+
+    As in `new_filter_bank`, the DC bin is removed so that a flat image produces no response, each kernel is
+    normalized to unit L2 norm and then the pair to a combined norm of 1 (norms are taken via Parseval).
+
+    Returns:
+        - a complex array of shape (2, fft_shape[0], fft_shape[1] // 2 + 1): the spectra of the even and odd
+          kernels, on the unnormalized (norm="backward") FFT scale
+    """
+    rows, cols = fft_shape
+    theta_rad = np.deg2rad(theta_deg)
+    sigma_px = _sigma_deg(f_s) / pixel_pitch
+    k0 = f_s * pixel_pitch  # cycle / px
+
+    # kernel coordinates are X along the columns and Y along the rows (see `new_spatial_filter`).
+    # The Gaussian is isotropic, so each lobe is separable: an outer product of two 1D Gaussians.
+    k_x = np.fft.rfftfreq(cols)
+    k_y = np.fft.fftfreq(rows)
+    a = 2 * np.pi ** 2 * sigma_px ** 2
+    c_x, c_y = k0 * np.cos(theta_rad), k0 * np.sin(theta_rad)
+    plus_y, plus_x = np.exp(-a * (k_y - c_y) ** 2), np.exp(-a * (k_x - c_x) ** 2)
+    minus_y, minus_x = np.exp(-a * (k_y + c_y) ** 2), np.exp(-a * (k_x + c_x) ** 2)
+
+    # Parseval on the half spectrum: every column except DC (and Nyquist, for even sizes) stands for two bins.
+    # Separability turns every sum over the grid into a product of two 1D sums.
+    weights = np.full(cols // 2 + 1, 2.0)
+    weights[0] = 1.0
+    if cols % 2 == 0:
+        weights[-1] = 1.0
+    plus_plus = (plus_y @ plus_y) * (weights @ (plus_x * plus_x))
+    minus_minus = (minus_y @ minus_y) * (weights @ (minus_x * minus_x))
+    plus_minus = (plus_y @ minus_y) * (weights @ (plus_x * minus_x))
+    dc_plus, dc_minus = plus_y[0] * plus_x[0], minus_y[0] * minus_x[0]
+    # energy of (plus +/- minus) / 2 with its DC bin removed
+    even_energy = ((plus_plus + minus_minus + 2 * plus_minus) / 4 - ((dc_plus + dc_minus) / 2) ** 2) / (rows * cols)
+    odd_energy = ((plus_plus + minus_minus - 2 * plus_minus) / 4 - ((dc_plus - dc_minus) / 2) ** 2) / (rows * cols)
+
+    out = np.zeros((2, rows, cols // 2 + 1), dtype=np.complex128)
+    even_scale = 0.5 / np.sqrt(2 * even_energy)
+    odd_scale = 0.5 / np.sqrt(2 * odd_energy)
+    np.multiply(plus_y[:, np.newaxis], even_scale * plus_x, out=out[0].real)
+    out[0].real += np.outer(minus_y, even_scale * minus_x)
+    np.multiply(plus_y[:, np.newaxis], odd_scale * plus_x, out=out[1].imag)
+    out[1].imag -= np.outer(minus_y, odd_scale * minus_x)
+    out[:, 0, 0] = 0.0
+    return out
 
 
 def new_temporal_filter(phase: float, frequency: float):
@@ -81,6 +220,8 @@ def new_temporal_filter(phase: float, frequency: float):
 
 
 def plot_spatial_gabors(gabors: list[NDArray], dpi: float, title: str):
+    import matplotlib.pyplot as plt
+
     num_gabors = len(gabors)
     print(f"--> plotting {num_gabors} kernels")
     num_per_row = min(5, num_gabors)
@@ -0,0 +1,166 @@
+"""Opt-in timing and memory instrumentation for the stimulus and energy pipeline.
+
+Library code marks its stages with ``stage(name)`` and its work with ``count(name, n)``. Both are
+no-ops unless a recorder is active, so instrumented code pays one context-variable lookup per call
+when instrumentation is off. Turn it on around the code of interest:
+
+    with instrumentation.record(trace_memory=True) as recorder:
+        energy.compute_features(stimulus, frequencies, thetas)
+    recorder.timings["compute_features"], recorder.counters["ffts"]
+
+or pass ``callback`` to ``record`` to receive every finished stage and counter increment as an
+``Event``, e.g. to forward them to a metrics pipeline.
+
+Counters used by the library: "frames", "channels", "ffts" (2-D transforms) and "bytes_allocated"
+(large arrays allocated by the pipeline).
+"""
+
+import contextlib
+import tracemalloc
+from collections import defaultdict
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable, ContextManager, Iterator, NamedTuple, Optional
+
+
+class Event(NamedTuple):
+    kind: str  # "stage" or "counter"
+    name: str
+    value: float  # seconds for a stage, the increment for a counter
+    peak_bytes: Optional[int] = None  # tracemalloc peak during a stage, when memory is traced
+
+
+class Recorder:
+    """Accumulates the stages and counters reported while it is active.
+
+    Stages with the same name accumulate: ``timings`` holds their total seconds, ``calls`` how often
+    they ran and, with ``trace_memory``, ``peak_bytes`` the highest traced memory seen during any of
+    them.
+    """
+
+    def __init__(self, callback: Optional[Callable[[Event], None]] = None, trace_memory: bool = False,
+                 parent: Optional["Recorder"] = None):
+        self.callback = callback
+        self.parent = parent  # an enclosing recorder that also receives everything reported here
+        self.trace_memory = trace_memory
+        self.timings: dict[str, float] = defaultdict(float)
+        self.calls: dict[str, int] = defaultdict(int)
+        self.counters: dict[str, int] = defaultdict(int)
+        self.peak_bytes: dict[str, int] = {}
+        self._open_peaks: list[int] = []  # running tracemalloc peak of every open stage
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        with self.parent.stage(name) if self.parent is not None else _disabled:
+            with self._own_stage(name):
+                yield
+
+    @contextlib.contextmanager
+    def _own_stage(self, name: str) -> Iterator[None]:
+        if self.trace_memory:
+            self._enter_peak()
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            seconds = perf_counter() - start
+            peak = self._exit_peak() if self.trace_memory else None
+            self.timings[name] += seconds
+            self.calls[name] += 1
+            if peak is not None:
+                self.peak_bytes[name] = max(self.peak_bytes.get(name, 0), peak)
+            if self.callback is not None:
+                self.callback(Event("stage", name, seconds, peak))
+
+    def count(self, name: str, value: int = 1) -> None:
+        if self.parent is not None:
+            self.parent.count(name, value)
+        self.counters[name] += value
+        if self.callback is not None:
+            self.callback(Event("counter", name, value))
+
+    def summary(self) -> dict:
+        """Plain-dict snapshot of everything recorded, e.g. for JSON."""
+        return {
+            "timings": dict(self.timings),
+            "calls": dict(self.calls),
+            "counters": dict(self.counters),
+            "peak_bytes": dict(self.peak_bytes),
+        }
+
+    def format(self) -> str:
+        """One-line human-readable summary."""
+        stages = ", ".join(f"{name} {seconds:.6f}s" for name, seconds in self.timings.items())
+        counters = " ".join(f"{name}={value}" for name, value in self.counters.items())
+        peaks = " ".join(f"{name}={peak / 2 ** 20:.1f}MB" for name, peak in self.peak_bytes.items())
+        return " | ".join(part for part in (stages, counters, peaks and f"peak {peaks}") if part)
+
+    def _enter_peak(self) -> None:
+        # tracemalloc has a single peak; fold it into the enclosing stage before resetting it for this one
+        peak = tracemalloc.get_traced_memory()[1]
+        if self._open_peaks:
+            self._open_peaks[-1] = max(self._open_peaks[-1], peak)
+        tracemalloc.reset_peak()
+        self._open_peaks.append(0)
+
+    def _exit_peak(self) -> int:
+        peak = max(self._open_peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._open_peaks:
+            self._open_peaks[-1] = max(self._open_peaks[-1], peak)
+        return peak
+
+
+_active: ContextVar[Optional[Recorder]] = ContextVar("motionenergy_recorder", default=None)
+_disabled = contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def record(callback: Optional[Callable[[Event], None]] = None, trace_memory: bool = False) -> Iterator[Recorder]:
+    """Activate a `Recorder` for the duration of the block.
+
+    Args:
+        callback: Called with every finished stage and counter increment
+        trace_memory: Also track the tracemalloc peak of every stage; starts tracemalloc if it isn't
+            running (and stops it again afterwards). Tracing slows allocation-heavy code noticeably.
+    """
+    recorder = Recorder(callback, trace_memory, parent=_active.get())
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _active.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _active.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def log_summary(label: str) -> Iterator[Recorder]:
+    """Record the block and print a one-line summary of it when it finishes.
+
+    This backs the ``verbose``-style flags of the library; an enclosing ``record`` still receives
+    everything.
+    """
+    with record() as recorder:
+        yield recorder
+    print(f"[{label}] {recorder.format()}")
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Time the enclosed block as stage `name` of the active recorder, if any."""
+    recorder = _active.get()
+    return _disabled if recorder is None else recorder.stage(name)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add `value` to counter `name` of the active recorder, if any."""
+    recorder = _active.get()
+    if recorder is not None:
+        recorder.count(name, value)
+
+
+def enabled() -> bool:
+    """Whether a recorder is active, for callers that would have to do extra work to report."""
+    return _active.get() is not None
@@ -0,0 +1,175 @@
+"""Up-front memory estimates for stimulus generation and energy extraction.
+
+The estimates mirror the allocations of ``drifting_sinusoidal.new_stimulus``, ``gabor.new_filter_bank``
+and ``energy.EnergyWorkspace``, so a run can be checked against a memory budget before anything large
+is allocated. ``plan_execution`` picks how to fit a run into a budget: all at once, or streaming the
+stimulus in chunks of frames through the filter bank one block of frequencies at a time.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+from numpy.typing import DTypeLike
+from scipy.fft import next_fast_len
+
+from motionenergy import gabor
+
+# new_stimulus keeps the meshgrid, the rotated coordinates, the spatial phase and a frame buffer alive
+# while it generates frames, all in float64 / int64
+_GENERATION_FRAMES = 5
+
+
+class MemoryEstimate(NamedTuple):
+    """Bytes held by each part of a stimulus -> features run."""
+    stimulus: int  # the stimulus volume (or the chunk of it being filtered)
+    generation: int  # per-frame temporaries of stimulus generation
+    filter_bank: int  # spatial kernels; alive while a workspace is prepared
+    workspace: int  # EnergyWorkspace buffers and kernel spectra
+    features: int  # the (T, F) float64 output
+
+    @property
+    def new_stimulus_peak(self) -> int:
+        return self.stimulus + self.generation
+
+    @property
+    def compute_features_peak(self) -> int:
+        return self.stimulus + self.filter_bank + self.workspace + self.features
+
+
+class ExecutionPlan(NamedTuple):
+    mode: str  # "in_memory": generate the whole stimulus, then filter it; "streaming": chunk by chunk
+    frame_chunk: int  # frames generated and filtered at a time
+    frequency_block: int  # filter bank frequencies prepared in one workspace at a time
+    peak_bytes: int
+    estimate: MemoryEstimate  # at this plan's chunk and block sizes
+
+
+def stimulus_shape(size: tuple[float, float], time: float, fps: float, px_pitch: float) -> tuple[int, int, int]:
+    """(T, X, Y) shape of the stimulus ``new_stimulus`` generates for these parameters."""
+    px_per_degree = 1.0 / px_pitch
+    return (int(np.ceil(time * fps)), int(np.ceil(size[0] * px_per_degree)), int(np.ceil(size[1] * px_per_degree)))
+
+
+def pad_size(frequencies: list[float], px_pitch: float) -> int:
+    """Zero padding ``EnergyWorkspace.prepare`` gives frames for this bank: the largest kernel's radius."""
+    return max(gabor.kernel_radius_px(f, px_pitch) for f in frequencies)
+
+
+def workspace_bytes(frame_shape: tuple[int, int], frequencies: list[float], thetas: list[float], px_pitch: float,
+                    dtype: DTypeLike = np.float64, min_pad_size: int = 0) -> int:
+    """Bytes of the buffers and kernel spectra ``EnergyWorkspace.prepare`` allocates."""
+    itemsize = np.dtype(dtype).itemsize
+    padding = max(pad_size(frequencies, px_pitch), min_pad_size)
+    # as in EnergyWorkspace.prepare: pad the frame, then round up to a fast length
+    fft_shape = (next_fast_len(frame_shape[0] + 2 * padding, real=True),
+                 next_fast_len(frame_shape[1] + 2 * padding, real=True))
+    real = fft_shape[0] * fft_shape[1] * itemsize
+    spectrum = fft_shape[0] * (fft_shape[1] // 2 + 1) * 2 * itemsize
+    num_unique = len(gabor.unique_channels([(f, theta) for f in frequencies for theta in thetas])[0])
+    # padded frame and even/odd responses; spectrum, product and scratch; an even and odd spectrum per channel
+    return 3 * real + (3 + 2 * num_unique) * spectrum
+
+
+def filter_bank_bytes(frequencies: list[float], thetas: list[float], px_pitch: float,
+                      dtype: DTypeLike = np.float64, analytic: bool = False) -> int:
+    """Upper bound on the bytes of the kernels ``gabor.new_filter_bank`` returns (none in the analytic path)."""
+    if analytic:
+        return 0
+    itemsize = np.dtype(dtype).itemsize
+    return sum(2 * len(thetas) * (2 * gabor.kernel_radius_px(f, px_pitch) + 1) ** 2 * itemsize for f in frequencies)
+
+
+def estimate_memory(size: tuple[float, float], time: float, fps: float, px_pitch: float,
+                    frequencies: list[float], thetas: list[float], dtype: DTypeLike = np.float64,
+                    display_dtype: Optional[DTypeLike] = None, analytic: bool = False,
+                    frame_chunk: Optional[int] = None, frequency_block: Optional[int] = None) -> MemoryEstimate:
+    """Predict the memory of generating a stimulus and extracting its features.
+
+    Args:
+        size, time, fps, px_pitch: as for ``new_stimulus``
+        frequencies, thetas: the filter bank, as for ``compute_features``
+        dtype: stimulus and working precision
+        display_dtype: predict a display-encoded stimulus instead (``new_stimulus(display_dtype=...)``)
+        analytic: as for ``compute_features``
+        frame_chunk: frames held at once; defaults to the whole stimulus
+        frequency_block: frequencies prepared at once; defaults to the whole bank. With several
+            blocks the largest one is reported.
+
+    Returns:
+        bytes per part of the run
+    """
+    num_frames, width, height = stimulus_shape(size, time, fps, px_pitch)
+    frame_chunk = num_frames if frame_chunk is None else min(frame_chunk, num_frames)
+    frequency_block = len(frequencies) if frequency_block is None else frequency_block
+    frame_pixels = width * height
+
+    stimulus_itemsize = np.dtype(display_dtype if display_dtype is not None else dtype).itemsize
+    generation = _GENERATION_FRAMES * frame_pixels * 8
+    if display_dtype is not None:
+        generation += frame_pixels * 8  # the encoder's float64 scratch frame
+
+    blocks = [frequencies[start:start + frequency_block] for start in range(0, len(frequencies), frequency_block)]
+    # every block is padded like the whole bank so that its features match (see EnergyWorkspace.prepare)
+    bank_pad = pad_size(frequencies, px_pitch)
+    return MemoryEstimate(
+        stimulus=frame_chunk * frame_pixels * stimulus_itemsize,
+        generation=generation,
+        filter_bank=max(filter_bank_bytes(block, thetas, px_pitch, dtype, analytic) for block in blocks),
+        workspace=max(workspace_bytes((width, height), block, thetas, px_pitch, dtype, bank_pad) for block in blocks),
+        features=num_frames * len(frequencies) * len(thetas) * 8,
+    )
+
+
+def plan_execution(size: tuple[float, float], time: float, fps: float, px_pitch: float,
+                   frequencies: list[float], thetas: list[float], memory_budget: int,
+                   dtype: DTypeLike = np.float64, analytic: bool = False, min_chunk: int = 16) -> ExecutionPlan:
+    """Choose how to run stimulus generation and feature extraction within `memory_budget` bytes.
+
+    The whole run in memory is preferred. Otherwise the stimulus is streamed: each chunk of frames is
+    generated and filtered before the next, and if the bank's spectra don't fit next to a chunk of
+    `min_chunk` frames, the bank is prepared a block of frequencies at a time (re-generating the
+    stimulus for every block). Fewer, larger blocks are preferred over larger chunks.
+
+    Raises:
+        ValueError: if the bank has no frequencies or no orientations
+        MemoryError: if not even one frame and one frequency fit in the budget
+    """
+    if not frequencies or not thetas:
+        raise ValueError("the filter bank needs at least one frequency and one orientation")
+    args = (size, time, fps, px_pitch, frequencies, thetas, dtype)
+    estimate = estimate_memory(*args, analytic=analytic)
+    peak = max(estimate.new_stimulus_peak, estimate.compute_features_peak)
+    num_frames = stimulus_shape(size, time, fps, px_pitch)[0]
+    if peak <= memory_budget:
+        return ExecutionPlan("in_memory", num_frames, len(frequencies), peak, estimate)
+
+    frame_bytes = estimate_memory(*args, analytic=analytic, frame_chunk=1).stimulus
+    fallback = None
+    for block in range(len(frequencies), 0, -1):
+        per_block = estimate_memory(*args, analytic=analytic, frame_chunk=0, frequency_block=block)
+        fixed = per_block.generation + per_block.filter_bank + per_block.workspace + per_block.features
+        chunk = min((memory_budget - fixed) // frame_bytes, num_frames) if memory_budget > fixed else 0
+        if chunk < 1:
+            continue
+        chunked = estimate_memory(*args, analytic=analytic, frame_chunk=chunk, frequency_block=block)
+        plan = ExecutionPlan("streaming", int(chunk), block, fixed + chunk * frame_bytes, chunked)
+        if chunk >= min(min_chunk, num_frames):
+            return plan
+        fallback = fallback or plan
+    if fallback is not None:
+        return fallback
+    raise MemoryError(f"a stimulus of {num_frames} frames and a bank of {len(frequencies)} frequencies x "
+                      f"{len(thetas)} orientations needs at least {_format_bytes(fixed + frame_bytes)} "
+                      f"(workspace {_format_bytes(per_block.workspace)}, features {_format_bytes(per_block.features)}) "
+                      f"even one frame and one frequency at a time; the budget is {_format_bytes(memory_budget)}")
+
+
+def check_budget(required: int, memory_budget: Optional[int], what: str) -> None:
+    """Raise MemoryError if `required` bytes exceed `memory_budget` (no-op without a budget)."""
+    if memory_budget is not None and required > memory_budget:
+        raise MemoryError(f"{what} needs about {_format_bytes(required)}, more than the budget of "
+                          f"{_format_bytes(memory_budget)}")
+
+
+def _format_bytes(num_bytes: int) -> str:
+    return f"{num_bytes / 2 ** 20:.1f} MiB"
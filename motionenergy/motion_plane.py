@@ -0,0 +1,128 @@
+"""Spectral velocity estimation: a cheap first pass before the filter bank.
+
+A pattern translating rigidly at velocity v puts all of its spatiotemporal energy on the plane
+f_t + v . f = 0 through the origin of the 3-D Fourier domain (spatial frequency f in cycles/deg,
+temporal frequency f_t in cycles/sec). ``estimate_velocity`` slides a space-time block over the
+stimulus, takes one windowed 3-D FFT per block and fits that plane to the block's power spectrum by
+weighted least squares, giving one velocity per block for the cost of a few small FFTs.
+
+A one-dimensional pattern such as a grating only constrains the velocity along its normal (the
+aperture problem); the fit then returns that normal velocity, as the filter bank would.
+
+Velocities follow the convention of ``drifting_sinusoidal.new_stimulus``: a direction of 0 deg moves
+along the stimulus' first spatial axis, 90 deg along its second, so a grating made with
+``theta_deg`` decodes to direction ``theta_deg``.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from numpy.typing import NDArray
+
+
+class VelocityMap(NamedTuple):
+    """One estimate per space-time block, each array of shape (len(frames), len(rows), len(columns))."""
+    speed: NDArray[np.floating]  # deg/sec
+    direction: NDArray[np.floating]  # degrees in [0, 360)
+    confidence: NDArray[np.floating]  # 1 - the fraction of spectral energy off the fitted plane
+    energy: NDArray[np.floating]  # mean power of the block's windowed, mean-subtracted signal
+    frames: NDArray[np.intp]  # first frame of each block
+    rows: NDArray[np.intp]  # first row of each block
+    columns: NDArray[np.intp]  # first column of each block
+    block: tuple[int, int, int]  # (frames, rows, columns) covered by each block
+
+    def moving(self, min_speed: float = 0.0, min_confidence: float = 0.5,
+               min_relative_energy: float = 0.01) -> NDArray[np.bool_]:
+        """Blocks with coherent motion faster than `min_speed`, and enough contrast to be worth filtering."""
+        with np.errstate(invalid="ignore"):
+            return ((self.speed > min_speed) & (self.confidence >= min_confidence) &
+                    (self.energy >= min_relative_energy * self.energy.max()))
+
+
+def estimate_velocity(stimulus: NDArray[np.floating], fps: float, px_pitch: float,
+                      block: tuple[int, int, int] = (16, 32, 32),
+                      step: Optional[tuple[int, int, int]] = None) -> VelocityMap:
+    """Velocity of every space-time block of a (T, H, W) stimulus or video.
+
+    Args:
+        stimulus: e.g. the output of ``drifting_sinusoidal.new_stimulus``
+        fps: frames per second of the stimulus
+        px_pitch: degrees per pixel
+        block: (frames, rows, columns) of each block; at most the stimulus' shape
+        step: distance between neighbouring blocks; half a block (50% overlap) by default
+
+    Returns:
+        per-block velocities; blocks without any contrast get nan speed, direction and confidence
+    """
+    block = tuple(min(size, length) for size, length in zip(block, stimulus.shape))
+    step = step or tuple(max(1, size // 2) for size in block)
+    frames = np.arange(0, stimulus.shape[0] - block[0] + 1, step[0])
+    rows = np.arange(0, stimulus.shape[1] - block[1] + 1, step[1])
+    columns = np.arange(0, stimulus.shape[2] - block[2] + 1, step[2])
+
+    # separable Hann window, and the frequency of every bin of the real 3-D FFT
+    windows = [np.hanning(size + 2)[1:-1] for size in block]
+    window = np.einsum("t,r,c->trc", *windows)
+    # Windowing convolves the spectrum with the window's, which adds the window's spectral variance
+    # to the second moment along each axis; it is subtracted again before the fit.
+    spacings = (1.0 / fps, px_pitch, px_pitch)
+    window_variance = []
+    for axis_window, spacing in zip(windows, spacings):
+        window_power = np.abs(np.fft.fft(axis_window)) ** 2
+        window_variance.append(np.sum(np.fft.fftfreq(len(axis_window), d=spacing) ** 2 * window_power) /
+                               window_power.sum())
+    f_t = np.fft.fftfreq(block[0], d=1.0 / fps)[:, np.newaxis, np.newaxis]
+    f_r = np.fft.fftfreq(block[1], d=px_pitch)[np.newaxis, :, np.newaxis]
+    f_c = np.fft.rfftfreq(block[2], d=px_pitch)[np.newaxis, np.newaxis, :]
+    # the real FFT holds one of every conjugate pair of bins, except the zero and Nyquist columns
+    multiplicity = np.full(f_c.shape, 2.0)
+    multiplicity[..., 0] = 1.0
+    if block[2] % 2 == 0:
+        multiplicity[..., -1] = 1.0
+    f_t, f_r, f_c = np.broadcast_arrays(f_t, f_r, f_c)
+    # moments of the spectrum needed by the plane fit: f_r^2, f_r f_c, f_c^2, f_r f_t, f_c f_t, f_t^2, total
+    basis = np.stack([f_r * f_r, f_r * f_c, f_c * f_c, f_r * f_t, f_c * f_t, f_t * f_t,
+                      np.ones_like(f_t)]) * multiplicity
+
+    shape = (len(frames), len(rows), len(columns))
+    moments = np.empty(shape + (len(basis),))
+    energy = np.empty(shape)
+    for time_idx, start in enumerate(frames):
+        # (rows, columns, block frames, block rows, block columns) views of this slab of frames
+        slab = np.asarray(stimulus[start:start + block[0]], dtype=np.float64)
+        blocks = sliding_window_view(slab, block[1:], axis=(1, 2))[:, ::step[1], ::step[2]][:, :len(rows), :len(columns)]
+        blocks = blocks.transpose(1, 2, 0, 3, 4)
+        blocks = (blocks - blocks.mean(axis=(2, 3, 4), keepdims=True)) * window
+        power = np.abs(np.fft.rfftn(blocks, axes=(2, 3, 4))) ** 2
+        moments[time_idx] = np.tensordot(power, basis, axes=([2, 3, 4], [1, 2, 3]))
+        energy[time_idx] = (blocks ** 2).mean(axis=(2, 3, 4))
+
+    variance_t, variance_r, variance_c = window_variance
+    total = moments[..., 6]
+    moments[..., 0] -= variance_r * total
+    moments[..., 2] -= variance_c * total
+    moments[..., 5] -= variance_t * total
+    speed, direction, confidence = _fit_planes(moments)
+    return VelocityMap(speed, direction, confidence, energy, frames, rows, columns, block)
+
+
+def _fit_planes(moments: NDArray[np.floating]) -> tuple[NDArray, NDArray, NDArray]:
+    # minimise sum P (f_t + v . f)^2 over v: (sum P f f^T) v = -sum P f f_t. For one-dimensional
+    # spectra the system is singular; the pseudo-inverse treats any spatial direction holding under
+    # 5% of the spectral spread as unconstrained, and so returns the normal velocity.
+    rr, rc, cc, rt, ct, tt, _ = np.moveaxis(moments, -1, 0)
+    norm = rr + cc + tt
+    matrix = np.stack([np.stack([rr, rc], axis=-1), np.stack([rc, cc], axis=-1)], axis=-2)
+    scale = np.maximum(rr + cc, np.finfo(float).tiny)[..., np.newaxis, np.newaxis]
+    velocity = -np.einsum("...ij,...j->...i", np.linalg.pinv(matrix / scale, rcond=0.05),
+                          np.stack([rt, ct], axis=-1) / scale[..., 0])
+    v_r, v_c = velocity[..., 0], velocity[..., 1]
+    # squared distance of the spectrum from the plane, relative to its squared distance from the origin
+    residual = tt + 2 * (v_r * rt + v_c * ct) + v_r ** 2 * rr + 2 * v_r * v_c * rc + v_c ** 2 * cc
+    with np.errstate(invalid="ignore", divide="ignore"):
+        confidence = 1.0 - residual / (1.0 + v_r ** 2 + v_c ** 2) / norm
+    blank = norm <= 0
+    speed = np.where(blank, np.nan, np.hypot(v_r, v_c))
+    direction = np.where(blank, np.nan, np.mod(np.rad2deg(np.arctan2(v_c, v_r)), 360.0))
+    return speed, direction, np.where(blank, np.nan, np.clip(confidence, 0.0, 1.0))
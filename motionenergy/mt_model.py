@@ -0,0 +1,43 @@
+"""MT integration stage on top of V1 motion energy."""
+
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy import sparse
+
+
+def mt_responses(energy: NDArray[np.floating],
+                 weights: sparse.spmatrix,
+                 block_size: int = 256,
+                 out: Optional[NDArray[np.floating]] = None) -> NDArray[np.floating]:
+    """Pool V1 energy into MT units with a sparse weight matrix.
+
+    Time is processed in blocks of `block_size` frames, each block costing one sparse matmul, so the
+    dense intermediate never exceeds (units, block_size).
+
+    Args:
+        energy: (T, F) output of ``energy.compute_features``, or (T, F, H', W') energy maps
+        weights: (units, F) or, for maps, (units, F * H' * W') weights from ``pooling_schemes``
+        block_size: Number of frames pooled per matmul
+        out: Optional preallocated output array of shape (T, units)
+
+    Returns:
+        MT responses of shape (T, units)
+    """
+    num_frames = energy.shape[0]
+    flat = energy.reshape(num_frames, -1)
+    num_units, num_inputs = weights.shape
+    if flat.shape[1] != num_inputs:
+        raise ValueError(f"weights expect {num_inputs} inputs per frame, energy has {flat.shape[1]}")
+    if out is None:
+        out = np.empty((num_frames, num_units), dtype=np.result_type(energy.dtype, weights.dtype))
+    elif out.shape != (num_frames, num_units):
+        raise ValueError(f"out has shape {out.shape}, expected {(num_frames, num_units)}")
+
+    # keep the sparse operand on the left: (units, F) @ (F, B)
+    weights = sparse.csr_matrix(weights)
+    for start in range(0, num_frames, block_size):
+        block = flat[start:start + block_size]
+        out[start:start + len(block)] = (weights @ block.T).T
+    return out
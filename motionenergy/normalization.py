@@ -0,0 +1,79 @@
+"""Divisive normalization of motion energy populations."""
+
+from typing import Optional, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy.ndimage import gaussian_filter
+
+POOL_AXES = ("orientation", "frequency")
+
+
+def pool_weights(channels: list[tuple[float, float]],
+                 across: Sequence[str] = POOL_AXES) -> NDArray[np.floating]:
+    """Build the (F, F) normalization pool of a filter bank.
+
+    Row i averages over the channels that normalize channel i: those sharing its frequency when
+    pooling across orientation, its orientation when pooling across frequency, every channel when
+    pooling across both, and only itself when ``across`` is empty.
+
+    Args:
+        channels: (f, theta) of each channel, as returned by ``gabor.new_filter_bank``
+        across: Which of "orientation" and "frequency" the pool spans
+
+    Returns:
+        Row-normalized weight matrix of shape (F, F)
+    """
+    unknown = set(across) - set(POOL_AXES)
+    if unknown:
+        raise ValueError(f"cannot pool across {sorted(unknown)}; expected a subset of {POOL_AXES}")
+    frequencies = np.array([f for f, _ in channels], dtype=float)
+    thetas = np.array([theta for _, theta in channels], dtype=float)
+
+    same_frequency = frequencies[:, np.newaxis] == frequencies[np.newaxis, :]
+    same_theta = thetas[:, np.newaxis] == thetas[np.newaxis, :]
+    in_pool = ((same_frequency | ("frequency" in across)) &
+               (same_theta | ("orientation" in across)))
+    weights = in_pool.astype(float)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def divisive_normalization(energy: NDArray[np.floating],
+                           weights: NDArray[np.floating],
+                           semi_saturation: float = 1.0,
+                           exponent: float = 2.0,
+                           spatial_sigma: Optional[float] = None,
+                           out: Optional[NDArray[np.floating]] = None) -> NDArray[np.floating]:
+    """Divisively normalize a motion energy population.
+
+    Computes ``E_i^n / (sigma^n + sum_j w_ij E_j^n)`` for every channel at once: the pool is a
+    single einsum over the channel axis, followed (for energy maps) by an optional spatial pool.
+
+    Args:
+        energy: Energy of shape (T, F) from ``energy.compute_features``, or maps of shape (T, F, H', W')
+        weights: (F, F) pool weights, e.g. from ``pool_weights``
+        semi_saturation: sigma, the energy at which the response reaches half saturation
+        exponent: n, applied to both the driving energy and the pool
+        spatial_sigma: For energy maps, standard deviation in pixels of a Gaussian spatial pool;
+            ``np.inf`` pools over the whole map. None keeps the pool pointwise.
+        out: Optional preallocated output array with the shape of ``energy``
+
+    Returns:
+        Normalized responses with the shape of ``energy``
+    """
+    if energy.ndim not in (2, 4):
+        raise ValueError(f"energy must have shape (T, F) or (T, F, H, W), got {energy.shape}")
+    num_channels = energy.shape[1]
+    if weights.shape != (num_channels, num_channels):
+        raise ValueError(f"weights have shape {weights.shape}, expected {(num_channels, num_channels)}")
+    if spatial_sigma is not None and energy.ndim != 4:
+        raise ValueError("spatial pooling needs energy maps of shape (T, F, H, W)")
+
+    driven = np.power(energy, exponent, out=out)
+    pool = np.einsum('ij,tj...->ti...', weights, driven, optimize=True)
+    if spatial_sigma is not None:
+        if np.isinf(spatial_sigma):
+            pool = np.broadcast_to(pool.mean(axis=(2, 3), keepdims=True), pool.shape)
+        else:
+            pool = gaussian_filter(pool, sigma=(0, 0, spatial_sigma, spatial_sigma), mode='nearest')
+    return np.divide(driven, semi_saturation ** exponent + pool, out=driven)
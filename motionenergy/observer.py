@@ -0,0 +1,168 @@
+"""Accumulator observer models driven by motion energy time series.
+
+Every simulator runs all trials of a condition at once: the decision variables of the trials that are
+still undecided live in one array that is advanced a frame at a time and compacted whenever trials
+cross a bound, so the cost per frame scales with the number of undecided trials. Noise comes from a
+``numpy.random.Generator`` built from ``seed``, so a given seed reproduces the same choices and RTs;
+use ``condition_seeds`` to give every condition of an experiment its own independent stream.
+"""
+
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+from numpy.typing import NDArray
+
+Seed = Union[None, int, np.random.SeedSequence, np.random.Generator]
+
+
+class ObserverResult(NamedTuple):
+    """Per-trial outcome. Trials that never reach a bound get choice -1 and an RT of nan."""
+    choices: NDArray[np.int8]  # DDM: 1 for the upper bound, 0 for the lower; race/switching: winning accumulator
+    rts: NDArray[np.floating]  # seconds, including the non-decision time
+
+
+def condition_seeds(seed: Optional[int], num_conditions: int) -> list[np.random.SeedSequence]:
+    """Independent, reproducible RNG streams, one per condition."""
+    return np.random.SeedSequence(seed).spawn(num_conditions)
+
+
+def simulate_ddm(evidence: NDArray[np.floating],
+                 num_trials: int,
+                 dt: float,
+                 drift_gain: float = 1.0,
+                 noise: float = 1.0,
+                 bound: float = 1.0,
+                 starting_point: float = 0.0,
+                 non_decision_time: float = 0.0,
+                 seed: Seed = None) -> ObserverResult:
+    """Drift-diffusion between symmetric bounds at +/- `bound`.
+
+    Args:
+        evidence: (T,) signed evidence per frame, e.g. opponent motion energy; the drift is drift_gain * evidence
+        num_trials: Number of trials to simulate
+        dt: Seconds per frame (1 / fps)
+        drift_gain: Scale from evidence to drift rate
+        noise: Diffusion coefficient (std of the accumulated noise per sqrt(second))
+        bound: Distance of each bound from zero
+        starting_point: Initial value of the decision variable
+        non_decision_time: Seconds added to every RT
+        seed: Seed or generator for the noise
+
+    Returns:
+        choices and RTs for every trial
+    """
+    evidence = _check_evidence(evidence, ndim=1)
+    rng = np.random.default_rng(seed)
+    choices, rts = _undecided(num_trials)
+    trials = np.arange(num_trials)
+    state = np.full(num_trials, float(starting_point))
+    noise_scale = noise * np.sqrt(dt)
+
+    for t, frame_evidence in enumerate(evidence):
+        if trials.size == 0:
+            break
+        state += drift_gain * frame_evidence * dt + noise_scale * rng.standard_normal(trials.size)
+        crossed = np.abs(state) >= bound
+        if crossed.any():
+            decided = trials[crossed]
+            choices[decided] = state[crossed] > 0
+            rts[decided] = (t + 1) * dt + non_decision_time
+            trials, state = trials[~crossed], state[~crossed]
+    return ObserverResult(choices, rts)
+
+
+def simulate_race(evidence: NDArray[np.floating],
+                  num_trials: int,
+                  dt: float,
+                  drift_gain: float = 1.0,
+                  noise: float = 1.0,
+                  bound: float = 1.0,
+                  non_decision_time: float = 0.0,
+                  seed: Seed = None) -> ObserverResult:
+    """Independent accumulators race to a common bound; the first to reach it is the choice.
+
+    Args:
+        evidence: (T, K) evidence per frame for each of the K alternatives, e.g. energy of K direction channels
+        num_trials, dt, drift_gain, noise, bound, non_decision_time, seed: as for `simulate_ddm`
+    """
+    evidence = _check_evidence(evidence, ndim=2)
+    rng = np.random.default_rng(seed)
+    choices, rts = _undecided(num_trials)
+    trials = np.arange(num_trials)
+    state = np.zeros((num_trials, evidence.shape[1]))
+    noise_scale = noise * np.sqrt(dt)
+
+    for t, frame_evidence in enumerate(evidence):
+        if trials.size == 0:
+            break
+        state += drift_gain * frame_evidence * dt + noise_scale * rng.standard_normal(state.shape)
+        trials, state = _settle(state, trials, bound, t, dt, non_decision_time, choices, rts)
+    return ObserverResult(choices, rts)
+
+
+def simulate_switching(evidence: NDArray[np.floating],
+                       num_trials: int,
+                       dt: float,
+                       switch_probability: float,
+                       drift_gain: float = 1.0,
+                       noise: float = 1.0,
+                       bound: float = 1.0,
+                       non_decision_time: float = 0.0,
+                       seed: Seed = None) -> ObserverResult:
+    """A race in which only the attended accumulator integrates.
+
+    Each trial attends one of the K alternatives (chosen uniformly at the start) and, at every frame,
+    switches to one of the others with probability `switch_probability`.
+
+    Args:
+        evidence: (T, K) evidence per frame for each alternative
+        switch_probability: Probability of switching attention per frame
+        num_trials, dt, drift_gain, noise, bound, non_decision_time, seed: as for `simulate_ddm`
+    """
+    evidence = _check_evidence(evidence, ndim=2)
+    num_alternatives = evidence.shape[1]
+    if num_alternatives < 2:
+        raise ValueError("a switching observer needs at least two alternatives")
+    rng = np.random.default_rng(seed)
+    choices, rts = _undecided(num_trials)
+    trials = np.arange(num_trials)
+    state = np.zeros((num_trials, num_alternatives))
+    attended = rng.integers(num_alternatives, size=num_trials)
+    noise_scale = noise * np.sqrt(dt)
+
+    for t, frame_evidence in enumerate(evidence):
+        if trials.size == 0:
+            break
+        switch = rng.random(trials.size) < switch_probability
+        attended[switch] = (attended[switch] + rng.integers(1, num_alternatives, size=switch.sum())) % num_alternatives
+        rows = np.arange(trials.size)
+        state[rows, attended] += (drift_gain * frame_evidence[attended] * dt +
+                                  noise_scale * rng.standard_normal(trials.size))
+        undecided = state.max(axis=1) < bound
+        trials, state = _settle(state, trials, bound, t, dt, non_decision_time, choices, rts)
+        attended = attended[undecided]
+    return ObserverResult(choices, rts)
+
+
+def _settle(state: NDArray[np.floating], trials: NDArray[np.intp], bound: float, t: int, dt: float,
+            non_decision_time: float, choices: NDArray[np.int8],
+            rts: NDArray[np.floating]) -> tuple[NDArray[np.intp], NDArray[np.floating]]:
+    # record the trials whose leading accumulator reached the bound and drop them from the active set
+    crossed = state.max(axis=1) >= bound
+    if not crossed.any():
+        return trials, state
+    decided = trials[crossed]
+    choices[decided] = state[crossed].argmax(axis=1)
+    rts[decided] = (t + 1) * dt + non_decision_time
+    return trials[~crossed], state[~crossed]
+
+
+def _undecided(num_trials: int) -> tuple[NDArray[np.int8], NDArray[np.floating]]:
+    return np.full(num_trials, -1, dtype=np.int8), np.full(num_trials, np.nan)
+
+
+def _check_evidence(evidence: NDArray[np.floating], ndim: int) -> NDArray[np.floating]:
+    evidence = np.asarray(evidence, dtype=float)
+    if evidence.ndim != ndim:
+        raise ValueError(f"evidence must have {ndim} dimension(s), got shape {evidence.shape}")
+    return evidence
@@ -0,0 +1,116 @@
+"""Sparse V1 -> MT pooling weight matrices.
+
+Each scheme returns a ``scipy.sparse.csr_matrix`` of shape (units, channels): row u holds the weights
+MT unit u gives to the V1 channels of a filter bank. Weights below ``threshold`` (relative to the
+row maximum) are dropped, which keeps large MT populations cheap to store and to evaluate.
+
+V1 channels are described by their (f, theta) metadata from ``gabor.new_filter_bank`` plus a preferred
+speed per channel (see ``decoding.channel_speeds``); theta is read as the channel's preferred direction
+of (normal) motion.
+"""
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy import sparse
+
+
+def new_mt_units(directions: list[float], speeds: list[float]) -> list[tuple[float, float]]:
+    """(direction in degrees, speed in deg/sec) of every MT unit, directions varying fastest."""
+    return [(direction, speed) for speed in speeds for direction in directions]
+
+
+def vector_average_weights(channels: list[tuple[float, float]],
+                           preferred_speeds: NDArray[np.floating],
+                           units: list[tuple[float, float]],
+                           exponent: float = 2.0,
+                           speed_bandwidth: float = 1.0,
+                           threshold: float = 1e-3) -> sparse.csr_matrix:
+    """Vector-average pooling: each unit sums channels tuned near its direction and speed.
+
+    The weight is a rectified cosine of the angle between the channel's and the unit's direction,
+    raised to `exponent`, times a Gaussian in log-speed (std `speed_bandwidth` octaves) between the
+    channel's preferred speed and the unit's speed.
+    """
+    unit_directions, unit_speeds = _unit_arrays(units)
+    channel_thetas = np.deg2rad([theta for _, theta in channels])
+    preferred_speeds = _check_speeds(channels, preferred_speeds)
+
+    direction_tuning = np.maximum(np.cos(channel_thetas[np.newaxis, :] - unit_directions[:, np.newaxis]), 0.0)
+    log_speed_offset = np.log2(preferred_speeds[np.newaxis, :]) - np.log2(unit_speeds[:, np.newaxis])
+    speed_tuning = np.exp(-0.5 * (log_speed_offset / speed_bandwidth) ** 2)
+    return _sparsify(direction_tuning ** exponent * speed_tuning, threshold)
+
+
+def intersection_of_constraints_weights(channels: list[tuple[float, float]],
+                                        preferred_speeds: NDArray[np.floating],
+                                        units: list[tuple[float, float]],
+                                        speed_bandwidth: float = 0.5,
+                                        threshold: float = 1e-3) -> sparse.csr_matrix:
+    """Intersection-of-constraints pooling: each unit sums the channels whose constraint lines pass
+    through its velocity.
+
+    A pattern moving with speed v in direction phi drives a component channel at normal direction
+    theta with normal speed v * cos(theta - phi). The weight is a Gaussian in log-speed (std
+    `speed_bandwidth` octaves) between that normal speed and the channel's preferred speed; channels
+    facing away from the unit's direction (cos <= 0) get no weight.
+    """
+    unit_directions, unit_speeds = _unit_arrays(units)
+    channel_thetas = np.deg2rad([theta for _, theta in channels])
+    preferred_speeds = _check_speeds(channels, preferred_speeds)
+
+    cosine = np.cos(channel_thetas[np.newaxis, :] - unit_directions[:, np.newaxis])
+    normal_speed = unit_speeds[:, np.newaxis] * cosine
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_speed_offset = np.log2(preferred_speeds[np.newaxis, :]) - np.log2(normal_speed)
+        weights = np.where(cosine > 0, np.exp(-0.5 * (log_speed_offset / speed_bandwidth) ** 2), 0.0)
+    return _sparsify(weights, threshold)
+
+
+def spatial_pooling_weights(weights: sparse.spmatrix,
+                            map_shape: tuple[int, int],
+                            stride: int,
+                            sigma: float,
+                            threshold: float = 1e-3) -> sparse.csr_matrix:
+    """Extend channel pooling weights to (F, H', W') energy maps.
+
+    MT receptive fields are normalized Gaussians (std `sigma` pixels) centred on a grid with spacing `stride`
+    over the map. Columns follow the C-order flattening of (F, H', W'); rows are ordered as the units of
+    `weights`, then receptive field position (row-major over the grid).
+
+    Returns:
+        csr matrix of shape (units * positions, F * H' * W')
+    """
+    height, width = map_shape
+    # A Gaussian receptive field is separable, so the (positions, pixels) matrix is a Kronecker product
+    # of two small 1D ones and never exists densely.
+    receptive_fields = sparse.kron(_receptive_fields_1d(height, stride, sigma, threshold),
+                                   _receptive_fields_1d(width, stride, sigma, threshold))
+    return sparse.kron(weights, receptive_fields, format='csr')
+
+
+def _receptive_fields_1d(length: int, stride: int, sigma: float, threshold: float) -> sparse.csr_matrix:
+    centres = np.arange(stride // 2, length, stride)
+    profiles = np.exp(-0.5 * ((centres[:, np.newaxis] - np.arange(length)[np.newaxis, :]) / sigma) ** 2)
+    profiles /= profiles.sum(axis=1, keepdims=True)
+    return _sparsify(profiles, threshold)
+
+
+def _unit_arrays(units: list[tuple[float, float]]) -> tuple[NDArray[np.floating], NDArray[np.floating]]:
+    directions = np.deg2rad([direction for direction, _ in units])
+    speeds = np.array([speed for _, speed in units], dtype=float)
+    if np.any(speeds <= 0):
+        raise ValueError("MT unit speeds must be positive")
+    return directions, speeds
+
+
+def _check_speeds(channels: list[tuple[float, float]], preferred_speeds: NDArray[np.floating]) -> NDArray[np.floating]:
+    preferred_speeds = np.asarray(preferred_speeds, dtype=float)
+    if preferred_speeds.shape != (len(channels),):
+        raise ValueError(f"expected {len(channels)} preferred speeds, got shape {preferred_speeds.shape}")
+    return preferred_speeds
+
+
+def _sparsify(weights: NDArray[np.floating], threshold: float) -> sparse.csr_matrix:
+    row_max = weights.max(axis=1, keepdims=True)
+    weights = np.where(weights >= threshold * row_max, weights, 0.0)
+    return sparse.csr_matrix(weights)
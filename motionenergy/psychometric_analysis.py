@@ -0,0 +1,179 @@
+"""Resumable psychometric sweeps over stimulus conditions.
+
+A sweep runs, for every condition of a grid, `num_trials` noisy stimuli through stimulus generation,
+``energy.compute_features`` and ``decoding``. Conditions are spread over a process pool and each one is
+checkpointed to its own ``.npz`` file as soon as it finishes, so an interrupted sweep picks up where it
+stopped and conditions that are already on disk are skipped when the sweep is re-run.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from motionenergy import decoding, drifting_sinusoidal, energy
+
+
+class SweepCondition(NamedTuple):
+    speed: float  # deg/sec
+    coherence: float  # fraction of the stimulus that is grating rather than pixel noise, in [0, 1]
+    contrast: float  # amplitude of the stimulus
+    orientation: float  # degrees
+
+
+class SweepSettings(NamedTuple):
+    """Everything besides the condition that determines a sweep's results."""
+    size: tuple[float, float]  # degrees of visual angle
+    spatial_frequency: float  # cycles/deg of the grating
+    time: float  # sec
+    fps: float
+    px_pitch: float  # deg / pixel
+    frequencies: tuple[float, ...]  # filter bank, cycles/deg
+    thetas: tuple[float, ...]  # filter bank, degrees
+    num_trials: int
+    seed: int = 0
+
+
+def condition_grid(speeds: list[float], coherences: list[float], contrasts: list[float],
+                   orientations: list[float]) -> list[SweepCondition]:
+    """Cartesian product of the condition values, orientation varying fastest."""
+    return [SweepCondition(speed, coherence, contrast, orientation)
+            for speed in speeds for coherence in coherences
+            for contrast in contrasts for orientation in orientations]
+
+
+def condition_path(output_dir: Path, condition: SweepCondition, settings: SweepSettings) -> Path:
+    """Checkpoint file of a condition; the name hashes the condition together with the settings."""
+    return Path(output_dir) / f"condition-{_condition_key(condition, settings)}.npz"
+
+
+def run_sweep(conditions: list[SweepCondition], settings: SweepSettings, output_dir: Path,
+              workers: Optional[int] = None, verbose: bool = False) -> list[Path]:
+    """Run every condition that has no checkpoint in `output_dir` yet.
+
+    Args:
+        conditions: Conditions to run, e.g. from `condition_grid`
+        settings: Stimulus, filter bank and trial settings shared by all conditions
+        output_dir: Directory holding one checkpoint file per condition
+        workers: Number of worker processes; defaults to all cores. With 1, conditions run in this process.
+        verbose: Whether to print progress
+
+    Returns:
+        The checkpoint path of every condition, in the order of `conditions`
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = [condition_path(output_dir, condition, settings) for condition in conditions]
+    pending = [(condition, path) for condition, path in zip(conditions, paths) if not path.exists()]
+    if verbose:
+        print(f"[run_sweep] {len(conditions) - len(pending)} of {len(conditions)} conditions already on disk")
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        completed = (_run_and_save(condition, settings, path) for condition, path in pending)
+        for done, path in enumerate(completed, start=1):
+            if verbose:
+                print(f"[run_sweep] {done}/{len(pending)} saved {path.name}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_and_save, condition, settings, path) for condition, path in pending]
+            for done, future in enumerate(futures, start=1):
+                path = future.result()
+                if verbose:
+                    print(f"[run_sweep] {done}/{len(pending)} saved {path.name}")
+    return paths
+
+
+def run_condition(condition: SweepCondition, settings: SweepSettings) -> dict[str, NDArray]:
+    """Simulate all trials of one condition.
+
+    The channels of ``gabor.new_filter_bank`` are purely spatial, so their energy carries no temporal
+    frequency and no speed can be decoded from it without being told the stimulus' speed; speed is
+    left to decoders trained on "mean_energy" (``decoding.StreamingLeastSquares``).
+
+    Returns:
+        arrays keyed by name: per-trial, per-frame decoded "direction" (axial, degrees) and "magnitude",
+        and the time-averaged "mean_energy" of every channel, of shape (num_trials, F)
+    """
+    frequencies, thetas = list(settings.frequencies), list(settings.thetas)
+    grating = drifting_sinusoidal.new_stimulus(condition.speed, settings.size, condition.orientation, 0.0,
+                                               settings.spatial_frequency, condition.contrast, settings.time,
+                                               settings.fps, settings.px_pitch, dtype=np.float32)
+    rng = np.random.default_rng(_condition_seed(condition, settings))
+    workspace = energy.EnergyWorkspace()
+    features = np.empty((settings.num_trials, grating.shape[0], len(frequencies) * len(thetas)))
+    stimulus = np.empty_like(grating)
+    for trial in range(settings.num_trials):
+        # noise is scaled like the grating so that contrast scales the whole stimulus
+        rng.standard_normal(out=stimulus, dtype=np.float32)
+        stimulus *= (1 - condition.coherence) * condition.contrast
+        stimulus += condition.coherence * grating
+        energy.compute_features(stimulus, frequencies, thetas, settings.px_pitch,
+                                workspace=workspace, out=features[trial])
+
+    direction, magnitude = decoding.population_vector(features, workspace.channels, axial=True)
+    return {
+        "direction": direction,
+        "magnitude": magnitude,
+        "mean_energy": features.mean(axis=1),
+    }
+
+
+def load_condition(path: Path) -> tuple[SweepCondition, dict[str, NDArray]]:
+    """Read a checkpoint back as its condition and result arrays."""
+    with np.load(path) as data:
+        results = {name: data[name] for name in data.files if name != "condition"}
+        condition = SweepCondition(**json.loads(str(data["condition"])))
+    return condition, results
+
+
+def iter_sweep_batches(paths: list[Path], target: str, batch_size: int = 4096, log_features: bool = True,
+                       rng: Optional[np.random.Generator] = None) -> Iterator[tuple[NDArray[np.floating], NDArray]]:
+    """Stream (features, label) minibatches from sweep checkpoints, one checkpoint in memory at a time.
+
+    Args:
+        paths: Checkpoints written by `run_sweep`
+        target: Field of ``SweepCondition`` used as the label, e.g. "orientation" or "speed"
+        batch_size: Maximum number of trials per batch
+        log_features: Use log energy, which puts contrasts on a common additive scale
+        rng: If given, visit the checkpoints in a random order
+
+    Yields:
+        features of shape (n, F) (the time-averaged energy of each trial) and labels of shape (n,)
+    """
+    if target not in SweepCondition._fields:
+        raise ValueError(f"unknown target {target!r}; expected one of {SweepCondition._fields}")
+    order = rng.permutation(len(paths)) if rng is not None else range(len(paths))
+    for index in order:
+        condition, results = load_condition(paths[index])
+        features = results["mean_energy"]
+        if log_features:
+            features = np.log(np.maximum(features, np.finfo(float).tiny))
+        labels = np.full(len(features), getattr(condition, target))
+        for start in range(0, len(features), batch_size):
+            yield features[start:start + batch_size], labels[start:start + batch_size]
+
+
+def _run_and_save(condition: SweepCondition, settings: SweepSettings, path: Path) -> Path:
+    results = run_condition(condition, settings)
+    # write to a temporary file and rename it into place, so a checkpoint is either complete or absent
+    temporary = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez(temporary, condition=json.dumps(condition._asdict()), **results)
+    os.replace(temporary, path)
+    return path
+
+
+def _condition_key(condition: SweepCondition, settings: SweepSettings) -> str:
+    description = json.dumps([condition._asdict(), settings._asdict()], sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()[:16]
+
+
+def _condition_seed(condition: SweepCondition, settings: SweepSettings) -> np.random.SeedSequence:
+    # derived from the condition itself rather than its position in the grid, so results don't depend on
+    # which other conditions are part of the sweep
+    return np.random.SeedSequence([settings.seed, int(_condition_key(condition, settings), 16)])
@@ -0,0 +1,22 @@
+import pytest
+
+from benchmarks import accuracy
+
+STIMULI = accuracy.stimulus_matrix()
+
+
+@pytest.mark.parametrize("engine", accuracy.ENGINES.values(), ids=list(accuracy.ENGINES))
+def test_engine_matches_reference(engine):
+    report = accuracy.evaluate(engine, STIMULI)
+    assert report["passed"], f"{engine.name}: max relative RMSE {report['max_relative_rmse']:.2e}"
+    assert len(report["stimuli"]) == 14
+    assert len(report["stimuli"][0]["rmse"]) == len(accuracy.FREQUENCIES) * len(accuracy.THETAS)
+
+
+def test_inaccurate_engine_fails():
+    def biased(stimulus, frequencies, thetas, px_pitch):
+        return 1.01 * accuracy.ENGINES["float32"].run(stimulus, frequencies, thetas, px_pitch)
+
+    report = accuracy.evaluate(accuracy.Engine("biased", biased, 1e-3), STIMULI[:2])
+    assert not report["passed"]
+    assert report["max_relative_rmse"] > 1e-3 and report["speedup"] > 0
@@ -0,0 +1,33 @@
+import json
+
+from benchmarks import energy_benchmarks
+
+
+def test_benchmark_report_is_json():
+    case = energy_benchmarks.new_case(0.5, 0.1, 30.0, 0.02, 2, 2)
+    report = energy_benchmarks.run_benchmarks([case], engines=("default", "float32"), isolate=False)
+
+    results = json.loads(json.dumps(report))["results"]
+    assert [(r["stage"], r["engine"]) for r in results] == [
+        ("new_stimulus", None), ("new_filter_bank", None),
+        ("compute_features", "default"), ("compute_features", "float32")]
+    for result in results:
+        assert result["wall_s"] > 0 and result["throughput"] > 0 and result["peak_rss_mb"] > 0
+    assert results[2]["throughput_unit"] == "frames*channels/s"
+
+
+def test_compare_flags_slower_stages():
+    case = energy_benchmarks.new_case(0.5, 0.1, 30.0, 0.02, 1, 1)
+    baseline = energy_benchmarks.run_benchmarks([case], stages=("new_filter_bank",), isolate=False)
+    slower = json.loads(json.dumps(baseline))
+    slower["results"][0]["wall_s"] *= 2
+
+    assert energy_benchmarks.compare(baseline, baseline) == []
+    assert len(energy_benchmarks.compare(baseline, slower)) == 1
+
+
+def test_compute_modules_import_without_matplotlib():
+    for module in ("motionenergy.drifting_sinusoidal", "motionenergy.gabor", "motionenergy.energy"):
+        result = energy_benchmarks.measure_import(module)
+        assert not result["loads_matplotlib"], module
+        assert result["wall_s"] > 0
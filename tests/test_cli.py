@@ -0,0 +1,67 @@
+import numpy as np
+import yaml
+
+from motionenergy import cli, drifting_sinusoidal, energy
+
+STIMULUS = {"speed": 2.0, "size": [1.0, 1.0], "theta_deg": 0.0, "phase": 0.0, "spatial_frequency": 2.0,
+            "amplitude": 1.0, "time": 0.1, "fps": 60.0}
+BANK = {"frequencies": [2.0, 4.0], "thetas": [0.0, 90.0], "px_pitch": 0.05}
+
+
+def _write_config(tmp_path, **sections):
+    config = {"stimulus": STIMULUS, "filter_bank": BANK, "output": str(tmp_path / "out"), "workers": 1, **sections}
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return path
+
+
+def test_extracts_every_stimulus_of_the_grid(tmp_path, capsys):
+    path = _write_config(tmp_path, grid={"theta_deg": [0.0, 90.0]}, engine={"dtype": "float32"})
+    assert cli.main([str(path)]) == 0
+    assert "2/2 wrote" in capsys.readouterr().out
+
+    with np.load(next((tmp_path / "out").glob("stimulus-0001-*.npz"))) as result:
+        features, channels = result["features"], result["channels"]
+    stimulus = drifting_sinusoidal.new_stimulus(*{**STIMULUS, "theta_deg": 90.0}.values(), BANK["px_pitch"],
+                                                dtype=np.float32)
+    np.testing.assert_array_equal(features, energy.compute_features(stimulus, BANK["frequencies"], BANK["thetas"],
+                                                                    BANK["px_pitch"]))
+    np.testing.assert_array_equal(channels, [(2.0, 0.0), (2.0, 90.0), (4.0, 0.0), (4.0, 90.0)])
+
+    # finished stimuli are skipped on a re-run
+    assert cli.main([str(path)]) == 0
+    assert "2 of 2 stimuli already on disk" in capsys.readouterr().out
+
+
+def test_failed_stimulus_exits_non_zero(tmp_path, capsys):
+    # the second condition drifts above the temporal Nyquist limit
+    path = _write_config(tmp_path, conditions=[{"speed": 1.0}, {"speed": 100.0}])
+    assert cli.main([str(path)]) == 1
+    assert len(list((tmp_path / "out").glob("stimulus-0000-*.npz"))) == 1
+    assert "FAILED stimulus-0001-" in capsys.readouterr().err
+
+
+def test_invalid_config_exits_with_usage_error(tmp_path, capsys):
+    path = _write_config(tmp_path, engine={"dtype": "float16"})
+    assert cli.main([str(path)]) == 2
+    path = _write_config(tmp_path, grid={"colour": ["red"]})
+    assert cli.main([str(path)]) == 2
+    assert "unknown stimulus parameter 'colour'" in capsys.readouterr().err
+    path = _write_config(tmp_path, grid={"theta_deg": 45.0})
+    assert cli.main([str(path)]) == 2
+    assert "grid must map stimulus parameters to lists" in capsys.readouterr().err
+    path = _write_config(tmp_path, stimulus={**STIMULUS, "size": 1.0})
+    assert cli.main([str(path)]) == 2
+    assert "stimulus size must be a [width, height] pair" in capsys.readouterr().err
+
+
+def test_edited_config_is_not_served_from_stale_results(tmp_path, capsys):
+    assert cli.main([str(_write_config(tmp_path))]) == 0
+    capsys.readouterr()
+    path = _write_config(tmp_path, filter_bank={**BANK, "frequencies": [2.0]})
+    assert cli.main([str(path)]) == 0
+    assert "0 of 1 stimuli already on disk" in capsys.readouterr().out
+
+    jobs = cli.expand_jobs(yaml.safe_load(path.read_text()))
+    with np.load(jobs[0].path) as result:
+        assert result["features"].shape[1] == len(BANK["thetas"])
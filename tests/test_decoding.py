@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from motionenergy import decoding
+
+CHANNELS = [(f, theta) for f in (0.5, 1.0, 2.0) for theta in (0.0, 90.0, 180.0, 270.0)]
+
+
+def test_population_vector_decodes_every_trial_and_time_point():
+    energy = np.random.default_rng(0).random((7, 5, len(CHANNELS)))
+    direction, magnitude = decoding.population_vector(energy, CHANNELS)
+
+    assert direction.shape == magnitude.shape == (7, 5)
+    for trial in range(7):
+        for t in range(5):
+            vector = sum(e * np.exp(1j * np.deg2rad(theta)) for e, (_, theta) in zip(energy[trial, t], CHANNELS))
+            assert np.isclose(direction[trial, t], np.rad2deg(np.angle(vector)) % 360)
+            assert np.isclose(magnitude[trial, t], abs(vector))
+
+
+def test_axial_population_vector_returns_orientation():
+    channels = [(1.0, theta) for theta in (0.0, 45.0, 90.0, 135.0)]
+    # on doubled angles 0 and 90 deg are opposite, so their equal energy cancels and leaves 45 deg
+    energy = np.array([[0.1, 1.0, 0.1, 0.0]])
+    direction, _ = decoding.population_vector(energy, channels, axial=True)
+    assert np.isclose(direction[0], 45.0)
+
+    # equal energy at theta and theta + 180 cancels as directions but adds up as one orientation
+    opposite = [(1.0, 45.0), (1.0, 225.0)]
+    _, magnitude = decoding.population_vector(np.ones(2), opposite)
+    orientation, axial_magnitude = decoding.population_vector(np.ones(2), opposite, axial=True)
+    assert np.isclose(magnitude, 0.0) and np.isclose(orientation, 45.0) and np.isclose(axial_magnitude, 2.0)
+
+
+def test_decode_speed_and_tuning_curve():
+    energy = np.zeros((2, len(CHANNELS)))
+    energy[0, 4:8] = 1.0  # all energy at f = 1
+    energy[1, :4] = energy[1, 8:] = 1.0  # split evenly between f = 0.5 and f = 2
+    estimate = decoding.decode(energy, CHANNELS, decoding.channel_speeds(CHANNELS, temporal_frequency=2.0))
+
+    np.testing.assert_allclose(estimate.speed, [2.0, 2.0])
+    thetas, curve = decoding.tuning_curve(energy, CHANNELS)
+    np.testing.assert_array_equal(thetas, [0.0, 90.0, 180.0, 270.0])
+    np.testing.assert_allclose(curve, [[1, 1, 1, 1], [2, 2, 2, 2]])
+
+    with pytest.raises(ValueError):
+        decoding.population_vector(energy[:, :-1], CHANNELS)
+
+
+def test_streaming_least_squares_equals_batch_fit(tmp_path):
+    rng = np.random.default_rng(0)
+    features = rng.standard_normal((500, 6))
+    targets = features @ rng.standard_normal((6, 2)) + 0.5 + 0.01 * rng.standard_normal((500, 2))
+
+    decoder = decoding.StreamingLeastSquares(6, 2, ridge=0.0)
+    for start in range(0, 300, 64):
+        decoder.partial_fit(features[start:min(start + 64, 300)], targets[start:min(start + 64, 300)])
+    decoder.save(tmp_path / "decoder.npz")
+    resumed = decoding.StreamingLeastSquares.load(tmp_path / "decoder.npz")
+    resumed.partial_fit(features[300:], targets[300:])
+
+    design = np.hstack([features, np.ones((500, 1))])
+    expected, *_ = np.linalg.lstsq(design, targets, rcond=None)
+    np.testing.assert_allclose(resumed.coef, expected, atol=1e-10)
+    assert resumed.num_samples == 500
+
+
+def test_streaming_logistic_regression_learns_separable_classes(tmp_path):
+    rng = np.random.default_rng(1)
+    centres = np.array([[0.0, 3.0], [3.0, 0.0], [-3.0, -3.0]]) + 10.0
+    labels = rng.integers(3, size=3000)
+    features = centres[labels] + rng.standard_normal((3000, 2))
+
+    decoder = decoding.StreamingLogisticRegression(2, classes=[0, 1, 2], learning_rate=0.5)
+    for start in range(0, 2000, 100):
+        decoder.partial_fit(features[start:start + 100], labels[start:start + 100], epochs=5)
+    decoder.save(tmp_path / "logistic.npz")
+    decoder = decoding.StreamingLogisticRegression.load(tmp_path / "logistic.npz")
+
+    assert (decoder.predict(features[2000:]) == labels[2000:]).mean() > 0.95
+    np.testing.assert_allclose(decoder.mean, features[:2000].mean(axis=0))
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from motionenergy import display, drifting_sinusoidal, energy
+
+STIMULUS_ARGS = (0.5, (2.0, 2.0), 45.0, 0.0, 1.0, 1.0, 0.2, 60.0, 0.02)
+
+
+@pytest.mark.parametrize("display_dtype", [np.uint8, np.uint16])
+def test_display_stimulus_round_trip(display_dtype):
+    stimulus = drifting_sinusoidal.new_stimulus(*STIMULUS_ARGS)
+    encoded = drifting_sinusoidal.new_stimulus(*STIMULUS_ARGS, display_dtype=display_dtype)
+
+    assert isinstance(encoded, display.DisplayStimulus)
+    assert encoded.frames.dtype == display_dtype
+    assert encoded.shape == stimulus.shape
+    assert encoded.frames.nbytes * 8 == stimulus.nbytes * np.dtype(display_dtype).itemsize
+
+    # decoding raises codes to the power gamma > 1, so the largest step in linear luminance is the one
+    # just below the brightest code
+    decoded = encoded.decode(dtype=np.float64)
+    step = 2 * encoded.amplitude * (1 - (1 - 1 / encoded.max_code) ** encoded.gamma)
+    assert np.abs(decoded - stimulus).max() <= step
+
+
+def test_compute_features_decodes_display_stimulus():
+    stimulus = drifting_sinusoidal.new_stimulus(*STIMULUS_ARGS)
+    encoded = drifting_sinusoidal.new_stimulus(*STIMULUS_ARGS, display_dtype=np.uint8)
+    frequencies = [0.5, 1.0, 2.0]
+    thetas = [0.0, 45.0, 90.0, 135.0]
+
+    features = energy.compute_features(stimulus, frequencies, thetas, 0.02)
+    encoded_features = energy.compute_features(encoded, frequencies, thetas, 0.02)
+    np.testing.assert_allclose(encoded_features,
+                               energy.compute_features(encoded.decode(), frequencies, thetas, 0.02))
+    assert np.abs(encoded_features - features).max() / features.max() < 1e-2
+
+
+def test_encode_rejects_non_positive_amplitude():
+    with pytest.raises(ValueError):
+        display.encode_frames([np.zeros((2, 2))], 1, (2, 2), amplitude=0.0)
@@ -0,0 +1,146 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+from motionenergy import drifting_sinusoidal, energy, gabor, instrumentation
+
+
+def _reference_features(stimulus, frequencies, thetas, px_pitch):
+    (even_filters, odd_filters), _ = gabor.new_filter_bank(frequencies, thetas, px_pitch)
+    max_kernel_size = max(kernel.shape[0] for kernel in even_filters)
+    padded_stimulus = energy._pad_stimulus_for_convolution(stimulus, max_kernel_size)
+    return np.array([
+        [energy._compute_quadrature_energy(frame, even[::-1, ::-1], odd[::-1, ::-1])
+         for even, odd in zip(even_filters, odd_filters)]
+        for frame in padded_stimulus
+    ])
+
+
+def test_workspace_matches_direct_convolution():
+    stimulus = np.random.default_rng(0).standard_normal((3, 40, 50))
+    frequencies = [2.0, 4.0]
+    thetas = [0.0, 45.0, 90.0]
+
+    features = energy.compute_features(stimulus, frequencies, thetas, 0.02)
+    reference = _reference_features(stimulus, frequencies, thetas, 0.02)
+
+    assert features.shape == (3, len(frequencies) * len(thetas))
+    np.testing.assert_allclose(features, reference, rtol=1e-10)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_workspace_reuse_does_not_allocate(dtype):
+    stimulus = np.random.default_rng(1).standard_normal((2, 200, 200)).astype(dtype)
+    frequencies = [1.0, 4.0]
+    thetas = [0.0, 90.0]
+    workspace = energy.EnergyWorkspace()
+    out = energy.compute_features(stimulus, frequencies, thetas, 0.02, workspace=workspace)
+    expected = out.copy()
+
+    tracemalloc.start()
+    try:
+        result = energy.compute_features(stimulus, frequencies, thetas, 0.02, workspace=workspace, out=out)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result is out
+    np.testing.assert_array_equal(result, expected)
+    # only small, shape-independent temporaries (reduction buffers) are allowed
+    assert peak < stimulus[0].nbytes
+
+
+def test_float32_features_match_float64_reference():
+    stimulus = drifting_sinusoidal.new_stimulus(0.5, (2.0, 2.0), 45.0, 0.0, 1.0, 1.0, 0.2, 60.0, 0.02)
+    stimulus_32 = drifting_sinusoidal.new_stimulus(0.5, (2.0, 2.0), 45.0, 0.0, 1.0, 1.0, 0.2, 60.0, 0.02,
+                                                   dtype=np.float32)
+    frequencies = [0.5, 1.0, 2.0]
+    thetas = [0.0, 45.0, 90.0, 135.0]
+    assert stimulus_32.dtype == np.float32
+
+    features = energy.compute_features(stimulus, frequencies, thetas, 0.02)
+    features_32 = energy.compute_features(stimulus_32, frequencies, thetas, 0.02)
+
+    assert features_32.dtype == np.float64
+    relative_error = np.abs(features_32 - features).max() / features.max()
+    assert relative_error < 1e-5
+
+
+def test_opposite_orientations_share_energy():
+    stimulus = np.random.default_rng(2).standard_normal((2, 40, 40))
+    features = energy.compute_features(stimulus, [2.0], [0.0, 45.0, 180.0, 225.0], 0.02)
+    reference = _reference_features(stimulus, [2.0], [0.0, 45.0], 0.02)
+
+    np.testing.assert_array_equal(features[:, :2], features[:, 2:])
+    np.testing.assert_allclose(features[:, :2], reference, rtol=1e-10)
+
+
+def test_analytic_transfer_functions_match_spatial_kernels():
+    stimulus = drifting_sinusoidal.new_stimulus(0.5, (2.0, 2.0), 45.0, 0.0, 1.0, 1.0, 0.2, 60.0, 0.02)
+    frequencies = [0.5, 1.0, 2.0]
+    thetas = [0.0, 45.0, 90.0, 135.0]
+
+    features = energy.compute_features(stimulus, frequencies, thetas, 0.02)
+    analytic = energy.compute_features(stimulus, frequencies, thetas, 0.02, analytic=True)
+
+    assert analytic.shape == features.shape
+    # the only difference is the n_sigmas truncation of the spatial kernels
+    assert (np.abs(analytic - features).max(axis=0) / features.max(axis=0)).max() < 2e-2
+
+
+def test_extend_features_computes_only_missing_channels():
+    stimulus = np.random.default_rng(4).standard_normal((3, 40, 50))
+    workspace = energy.EnergyWorkspace()
+    features = energy.compute_features(stimulus, [2.0, 4.0], [0.0, 90.0], 0.02, workspace=workspace)
+    spectra = energy.frame_spectra(stimulus, workspace)
+
+    # a new frequency row and a new orientation column, plus a duplicate of a known channel
+    new_channels = [(3.0, 0.0), (3.0, 45.0), (3.0, 90.0), (2.0, 45.0), (4.0, 45.0), (2.0, 0.0)]
+    with instrumentation.record() as recorder:
+        merged, channels = energy.extend_features(stimulus, features, workspace.channels, new_channels, 0.02,
+                                                  spectra=spectra)
+    assert recorder.counters["channels"] == 5
+    # no forward transforms: every frame spectrum comes from `spectra`
+    assert recorder.counters["ffts"] == 2 * 5 + len(stimulus) * 2 * 5
+
+    expected = energy.compute_features(stimulus, [2.0, 3.0, 4.0], [0.0, 45.0, 90.0], 0.02)
+    assert channels == [(f, theta) for f in (2.0, 3.0, 4.0) for theta in (0.0, 45.0, 90.0)]
+    np.testing.assert_allclose(merged, expected, rtol=1e-10)
+    np.testing.assert_array_equal(merged[:, [0, 2, 6, 8]], features)
+
+
+def test_extend_features_recomputes_when_the_pad_grows():
+    stimulus = np.random.default_rng(5).standard_normal((2, 40, 50))
+    features = energy.compute_features(stimulus, [4.0], [0.0, 90.0], 0.02)
+
+    # the 2 cycles/deg kernels are wider, so the merged bank pools every channel over a smaller region
+    with instrumentation.record() as recorder:
+        merged, channels = energy.extend_features(stimulus, features, [(4.0, 0.0), (4.0, 90.0)],
+                                                  [(2.0, 0.0), (2.0, 90.0)], 0.02)
+    assert recorder.counters["channels"] == 4
+    expected = energy.compute_features(stimulus, [2.0, 4.0], [0.0, 90.0], 0.02)
+    assert channels == [(2.0, 0.0), (2.0, 90.0), (4.0, 0.0), (4.0, 90.0)]
+    np.testing.assert_allclose(merged, expected, rtol=1e-10)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_delta_updates_match_full_transforms(dtype):
+    # a small bar moving over a static noise background: only a few tiles change per frame
+    rng = np.random.default_rng(6)
+    stimulus = np.repeat(rng.standard_normal((1, 160, 160)), 12, axis=0)
+    for t in range(len(stimulus)):
+        stimulus[t, 70:76, 5 + 4 * t:9 + 4 * t] += 3.0
+    stimulus = stimulus.astype(dtype)
+    frequencies = [4.0, 8.0]
+    thetas = [0.0, 45.0, 90.0, 135.0]
+
+    expected = energy.compute_features(stimulus, frequencies, thetas, 0.02)
+    with instrumentation.record() as recorder:
+        features = energy.compute_features(stimulus, frequencies, thetas, 0.02, delta_resync=5)
+    # frames 0, 5 and 10 re-sync, the others are updated from the frame difference
+    assert recorder.counters["delta_syncs"] == 3
+    assert recorder.counters["delta_updates"] == 9
+    np.testing.assert_allclose(features, expected, rtol=1e-10 if dtype == np.float64 else 1e-5)
+
+    with pytest.raises(ValueError, match="analytic"):
+        energy.compute_features(stimulus, frequencies, thetas, 0.02, analytic=True, delta_resync=5)
@@ -0,0 +1,72 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from motionenergy import drifting_sinusoidal, energy, feature_cache, instrumentation
+
+FREQUENCIES = [2.0, 4.0]
+THETAS = [0.0, 90.0]
+PX_PITCH = 0.05
+STIMULUS = (1.0, (1.0, 1.0), 0.0, 0.0, 2.0, 1.0, 0.2, 60.0, PX_PITCH)
+
+
+def test_hit_skips_the_fft_path(tmp_path):
+    cache = feature_cache.FeatureCache(tmp_path)
+    stimulus = drifting_sinusoidal.new_stimulus(*STIMULUS)
+    expected = energy.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH)
+
+    first = cache.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH)
+    with instrumentation.record() as recorder:
+        second = cache.compute_features(stimulus.copy(), FREQUENCIES, THETAS, PX_PITCH)
+    np.testing.assert_array_equal(first, expected)
+    np.testing.assert_array_equal(second, expected)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert recorder.counters["cache_hits"] == 1 and "ffts" not in recorder.counters
+
+    # a different stimulus, engine or bank misses
+    cache.compute_features(stimulus[::-1], FREQUENCIES, THETAS, PX_PITCH)
+    cache.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH, analytic=True)
+    cache.compute_features(stimulus, FREQUENCIES, [0.0], PX_PITCH)
+    assert cache.misses == 4
+
+
+def test_parameters_key_the_stimulus(tmp_path):
+    cache = feature_cache.FeatureCache(tmp_path)
+    params = {"args": list(STIMULUS)}
+    stimulus = drifting_sinusoidal.new_stimulus(*STIMULUS)
+    cache.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH, stimulus_params=params)
+    out = np.empty((len(stimulus), 4))
+    cache.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH, stimulus_params=params, out=out)
+    assert cache.hits == 1
+    np.testing.assert_array_equal(out, energy.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH))
+
+
+def test_eviction_keeps_the_cache_bounded(tmp_path):
+    entry_bytes = 12 * 4 * 8 + 128  # features plus the .npy header
+    cache = feature_cache.FeatureCache(tmp_path, max_bytes=3 * entry_bytes)
+    stimulus = drifting_sinusoidal.new_stimulus(*STIMULUS)
+    for amplitude in range(1, 6):
+        cache.compute_features(stimulus * amplitude, FREQUENCIES, THETAS, PX_PITCH)
+    assert cache.size_bytes() <= 3 * entry_bytes
+    assert len(list(tmp_path.glob("*.npy"))) == 3
+    # the most recent entries survive
+    cache.compute_features(stimulus * 5, FREQUENCIES, THETAS, PX_PITCH)
+    assert cache.hits == 1
+
+
+def _cached_features(directory, amplitude):
+    cache = feature_cache.FeatureCache(directory, max_bytes=4 * (12 * 4 * 8 + 128))
+    stimulus = drifting_sinusoidal.new_stimulus(*STIMULUS) * amplitude
+    return cache.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH)
+
+
+def test_concurrent_workers(tmp_path):
+    amplitudes = [1 + i % 6 for i in range(24)]
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(_cached_features, [tmp_path] * len(amplitudes), amplitudes))
+    stimulus = drifting_sinusoidal.new_stimulus(*STIMULUS)
+    for amplitude, features in zip(amplitudes, results):
+        np.testing.assert_allclose(features, energy.compute_features(stimulus * amplitude, FREQUENCIES, THETAS,
+                                                                     PX_PITCH))
+    assert feature_cache.FeatureCache(tmp_path).size_bytes() <= 4 * (12 * 4 * 8 + 128)
+    assert not list(tmp_path.glob(".*.tmp"))
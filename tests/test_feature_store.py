@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from motionenergy import feature_store
+
+CHANNELS = [(f, theta) for f in (1.0, 2.0) for theta in (0.0, 45.0, 90.0)]
+PX_PITCH = 0.05
+
+
+def _features(seed, num_frames=20):
+    return np.random.default_rng(seed).random((num_frames, len(CHANNELS)))
+
+
+def test_round_trip_and_partial_reads(tmp_path):
+    store = feature_store.FeatureStore.create(tmp_path / "store", CHANNELS, PX_PITCH)
+    features = [_features(seed) for seed in range(3)]
+    for speed, condition_features in zip((1.0, 2.0, 4.0), features):
+        store.append(condition_features, {"speed": speed, "theta_deg": 0.0})
+
+    reopened = feature_store.FeatureStore(tmp_path / "store")
+    assert reopened.channels == CHANNELS
+    np.testing.assert_array_equal(reopened.read(1), features[1])
+
+    columns = reopened.channel_indices(frequencies=[2.0], thetas=[0.0, 90.0])
+    assert columns == [3, 5]
+    np.testing.assert_array_equal(reopened.read(2, columns, slice(5, 10)), features[2][5:10, columns])
+    assert reopened.find(speed=2.0) == [1]
+    np.testing.assert_array_equal(reopened.read_many([0, 2], [0]), np.stack([features[0], features[2]])[..., [0]])
+
+
+def test_provenance_and_crash_safety(tmp_path):
+    store = feature_store.FeatureStore.create(tmp_path, CHANNELS, PX_PITCH)
+    store.append(_features(0), {"speed": 1.0}, engine={"analytic": True})
+    assert store.verify(0)
+    assert store.conditions[0]["provenance"] != feature_store.provenance_hash({"speed": 1.0}, CHANNELS, PX_PITCH)
+
+    # a record cut short by a crash is ignored and then overwritten by the next append
+    with open(tmp_path / feature_store.CONDITIONS, "a") as file:
+        file.write('{"chunk": "chunk-0000')
+    assert len(feature_store.FeatureStore(tmp_path).conditions) == 1
+    store.append(_features(1), {"speed": 2.0})
+    reopened = feature_store.FeatureStore(tmp_path)
+    assert [record["stimulus"]["speed"] for record in reopened.conditions] == [1.0, 2.0]
+    np.testing.assert_array_equal(reopened.read(1), _features(1))
+
+
+def test_features_from_another_version_fail_verification(tmp_path, monkeypatch):
+    store = feature_store.FeatureStore.create(tmp_path, CHANNELS, PX_PITCH)
+    store.append(_features(0), {"speed": 1.0})
+    monkeypatch.setattr(feature_store, "__version__", "0.0.0")
+    assert not store.verify(0)
+
+
+def test_rejects_mismatched_features(tmp_path):
+    store = feature_store.FeatureStore.create(tmp_path, CHANNELS, PX_PITCH)
+    with pytest.raises(ValueError):
+        store.append(np.zeros((5, 2)), {})
+    with pytest.raises(FileExistsError):
+        feature_store.FeatureStore.create(tmp_path, CHANNELS, PX_PITCH)
@@ -1,3 +1,4 @@
+import numpy as np
 from motionenergy import gabor
 
 
@@ -9,3 +10,41 @@ def test_can_create_filter_bank():
     assert len(filters) == 2, "must have one array per phase"
     assert len(filters[0]) == len(filters[1]), "each phase array must have the same number of channels"
 
+
+
+def test_filter_bank_derives_symmetric_channels_exactly():
+    thetas = [0, 30, 45, 60, 90, 120, 135, 180, 210, 270]
+    frequencies = [0.5, 2]
+    px_pitch = 0.02
+    (even_filters, odd_filters), channels = gabor.new_filter_bank(frequencies, thetas, px_pitch)
+    for even, odd, (f, theta) in zip(even_filters, odd_filters, channels[0]):
+        expected_even = gabor.new_spatial_filter(theta, 0, f, px_pitch)
+        expected_odd = gabor.new_spatial_filter(theta, np.pi / 2, f, px_pitch)
+        norm = np.sqrt((expected_even ** 2 + expected_odd ** 2).sum())
+        np.testing.assert_allclose(even, expected_even / norm, atol=1e-12)
+        np.testing.assert_allclose(odd, expected_odd / norm, atol=1e-12)
+
+
+def test_unique_channels_groups_opposite_orientations():
+    channels = [(1, 0), (1, 90), (1, 180), (2, 180), (1, 270), (2, 0), (1, 22.5 * 8)]
+    representatives, inverse = gabor.unique_channels(channels)
+    assert representatives == [0, 1, 3]
+    assert inverse.tolist() == [0, 1, 0, 2, 1, 2, 0]
+
+
+def test_transfer_function_matches_spatial_quadrature_pair():
+    fft_shape = (256, 301)
+    f, theta, px_pitch = 2.0, 30.0, 0.02
+    transfer = gabor.new_transfer_function(theta, f, px_pitch, fft_shape)
+    even = np.fft.irfft2(transfer[0], s=fft_shape)
+    odd = np.fft.irfft2(transfer[1], s=fft_shape)
+
+    assert np.isclose((even ** 2).sum() + (odd ** 2).sum(), 1.0)
+    assert abs(even.sum()) < 1e-12 and abs(odd.sum()) < 1e-12
+
+    (even_filters, odd_filters), _ = gabor.new_filter_bank([f], [theta], px_pitch)
+    radius = even_filters[0].shape[0] // 2
+    # the transfer functions describe origin-centred kernels; shift them back to the kernel grid
+    window = np.ix_(np.arange(-radius, radius + 1) % fft_shape[0], np.arange(-radius, radius + 1) % fft_shape[1])
+    np.testing.assert_allclose(even[window], even_filters[0], atol=2e-3 * np.abs(even_filters[0]).max())
+    np.testing.assert_allclose(odd[window], odd_filters[0], atol=2e-3 * np.abs(odd_filters[0]).max())
@@ -0,0 +1,36 @@
+import numpy as np
+
+from motionenergy import drifting_sinusoidal, foveation
+
+FREQUENCIES = [1.0, 2.0, 4.0, 8.0]
+THETAS = [0.0, 45.0, 90.0, 135.0]
+PX_PITCH = 0.05
+
+
+def test_foveation_filters_an_order_of_magnitude_fewer_pixels():
+    grid = foveation.new_grid((1080, 1920), 0.02, fovea_radius=1.0)
+    assert grid.num_rings == 6
+    assert foveation.pixel_count(grid) * 10 < 1080 * 1920
+
+
+def test_display_grid_uses_monitor_geometry():
+    grid = foveation.display_grid((600, 800), 60.0, (1920, 1080), 24.0, fovea_radius=2.0)
+    assert 0.01 < grid.px_pitch < 0.05
+    assert grid.fixation == (299.5, 399.5)
+
+
+def test_ring_channels_scale_with_eccentricity():
+    # a 2 cycles/deg grating at 0 deg varies along the stimulus' first axis (drifting_sinusoidal), the
+    # axis along which the 90 deg kernels of gabor.new_filter_bank oscillate
+    stimulus = drifting_sinusoidal.new_stimulus(1.0, (12.0, 12.0), 0.0, 0.0, 2.0, 1.0, 0.1, 30.0, PX_PITCH)
+    grid = foveation.new_grid(stimulus.shape[1:], PX_PITCH, fovea_radius=1.5)
+    energy = foveation.foveated_features(stimulus, FREQUENCIES, THETAS, grid)
+    assert energy.shape == (len(stimulus), grid.num_rings, len(FREQUENCIES) * len(THETAS))
+
+    mean_energy = energy.mean(axis=0).reshape(grid.num_rings, len(FREQUENCIES), len(THETAS))
+    for ring in range(3):
+        # channel f prefers f / 2**ring cycles/deg in this ring, so the grating drives f = 2 * 2**ring
+        assert foveation.ring_frequencies(FREQUENCIES, ring).index(2.0) == ring + 1
+        freq_idx, theta_idx = np.unravel_index(mean_energy[ring].argmax(), mean_energy[ring].shape)
+        assert (FREQUENCIES[freq_idx], THETAS[theta_idx]) == (2.0 * 2 ** ring, 90.0)
+    assert foveation.pool_rings(energy, grid).shape == (len(stimulus), len(FREQUENCIES) * len(THETAS))
@@ -0,0 +1,55 @@
+from motionenergy import drifting_sinusoidal, energy, instrumentation
+
+FREQUENCIES = [2.0, 4.0]
+THETAS = [0.0, 90.0, 180.0]
+PX_PITCH = 0.05
+
+
+def _stimulus():
+    return drifting_sinusoidal.new_stimulus(1.0, (1.0, 1.0), 0.0, 0.0, 2.0, 1.0, 0.1, 60.0, PX_PITCH)
+
+
+def test_records_stages_and_counters():
+    events = []
+    with instrumentation.record(callback=events.append) as recorder:
+        stimulus = _stimulus()
+        features = energy.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH)
+
+    num_frames = len(stimulus)
+    assert {"new_stimulus", "compute_features", "workspace.prepare", "new_filter_bank"} <= set(recorder.timings)
+    assert recorder.calls["compute_features"] == 1
+    assert recorder.counters["frames"] == 2 * num_frames  # generated, then filtered
+    assert recorder.counters["channels"] == features.shape[1]
+    # theta = 180 shares its kernels with theta = 0: 4 unique channels, an even and an odd kernel each
+    assert recorder.counters["ffts"] == 2 * 4 + num_frames * (1 + 2 * 4)
+    assert recorder.counters["bytes_allocated"] >= stimulus.nbytes + features.nbytes
+    assert sum(event.value for event in events if event.name == "ffts") == recorder.counters["ffts"]
+    assert all(event.peak_bytes is None for event in events)
+
+
+def test_trace_memory_reports_stage_peaks():
+    with instrumentation.record(trace_memory=True) as recorder:
+        stimulus = _stimulus()
+    # the stage allocates the stimulus itself
+    assert recorder.peak_bytes["new_stimulus"] >= stimulus.nbytes
+
+
+def test_nested_recorders_both_receive_events():
+    with instrumentation.record() as outer:
+        with instrumentation.record() as inner:
+            _stimulus()
+        _stimulus()
+    assert inner.calls["new_stimulus"] == 1
+    assert outer.calls["new_stimulus"] == 2
+
+
+def test_disabled_by_default(capsys):
+    assert not instrumentation.enabled()
+    with instrumentation.stage("anything"):
+        instrumentation.count("frames")
+    stimulus = _stimulus()
+    assert capsys.readouterr().out == ""
+
+    energy.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH, verbose=True)
+    printed = capsys.readouterr().out.strip().splitlines()
+    assert len(printed) == 1 and printed[0].startswith("[compute_features]")
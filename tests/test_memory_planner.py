@@ -0,0 +1,76 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from motionenergy import drifting_sinusoidal, energy, memory_planner
+
+STIMULUS = (1.0, (3.0, 2.0), 30.0, 0.0, 2.0, 1.0, 0.5, 60.0, 0.02)  # speed ... px_pitch, as for new_stimulus
+SIZE, TIME, FPS, PX_PITCH = STIMULUS[1], STIMULUS[6], STIMULUS[7], STIMULUS[8]
+FREQUENCIES = [1.0, 2.0, 4.0]
+THETAS = [0.0, 45.0, 90.0, 135.0]
+
+
+def _traced_peak(function):
+    tracemalloc.start()
+    try:
+        result = function()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_estimates_match_traced_peaks():
+    # estimates are within a few percent of what tracemalloc sees; small Python objects aren't modelled
+    estimate = memory_planner.estimate_memory(SIZE, TIME, FPS, PX_PITCH, FREQUENCIES, THETAS)
+
+    stimulus, stimulus_peak = _traced_peak(lambda: drifting_sinusoidal.new_stimulus(*STIMULUS))
+    assert estimate.stimulus == stimulus.nbytes
+    assert 0.95 * stimulus_peak <= estimate.new_stimulus_peak < 1.2 * stimulus_peak
+
+    _, features_peak = _traced_peak(lambda: energy.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH))
+    # the traced peak doesn't include the stimulus, which was allocated before tracing started
+    assert 0.95 * features_peak <= estimate.compute_features_peak - estimate.stimulus < 1.2 * features_peak
+
+
+def test_iter_stimulus_chunks_matches_new_stimulus():
+    stimulus = drifting_sinusoidal.new_stimulus(*STIMULUS)
+    chunks = [chunk.copy() for chunk in drifting_sinusoidal.iter_stimulus_chunks(*STIMULUS, 7)]
+    assert [len(chunk) for chunk in chunks] == [7, 7, 7, 7, 2]
+    np.testing.assert_array_equal(np.concatenate(chunks), stimulus)
+
+
+@pytest.mark.parametrize("fraction", [2.0, 0.7, 0.6])
+def test_stream_features_matches_compute_features(fraction):
+    expected = energy.compute_features(drifting_sinusoidal.new_stimulus(*STIMULUS), FREQUENCIES, THETAS, PX_PITCH)
+    estimate = memory_planner.estimate_memory(SIZE, TIME, FPS, PX_PITCH, FREQUENCIES, THETAS)
+    budget = int(fraction * estimate.compute_features_peak)
+
+    plan = memory_planner.plan_execution(SIZE, TIME, FPS, PX_PITCH, FREQUENCIES, THETAS, budget)
+    assert plan.peak_bytes <= budget
+    assert plan.mode == ("in_memory" if fraction > 1 else "streaming")
+
+    np.testing.assert_allclose(energy.stream_features(*STIMULUS, FREQUENCIES, THETAS, budget), expected,
+                               rtol=1e-12, atol=0)
+
+
+def test_compute_features_splits_bank_to_fit_budget():
+    stimulus = drifting_sinusoidal.new_stimulus(*STIMULUS)
+    expected = energy.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH)
+    estimate = memory_planner.estimate_memory(SIZE, TIME, FPS, PX_PITCH, FREQUENCIES, THETAS)
+
+    blocked = energy.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH,
+                                      memory_budget=int(0.8 * estimate.compute_features_peak))
+    np.testing.assert_allclose(blocked, expected, rtol=1e-12, atol=0)
+
+
+def test_over_budget_fails_fast():
+    with pytest.raises(MemoryError, match="new_stimulus"):
+        drifting_sinusoidal.new_stimulus(*STIMULUS, memory_budget=2 ** 20)
+    with pytest.raises(MemoryError, match="one frame and one frequency"):
+        memory_planner.plan_execution(SIZE, TIME, FPS, PX_PITCH, FREQUENCIES, THETAS, 2 ** 20)
+    with pytest.raises(ValueError, match="at least one frequency"):
+        memory_planner.plan_execution(SIZE, TIME, FPS, PX_PITCH, [], THETAS, 2 ** 20)
+    stimulus = drifting_sinusoidal.new_stimulus(*STIMULUS)
+    with pytest.raises(MemoryError, match="one frequency at a time"):
+        energy.compute_features(stimulus, FREQUENCIES, THETAS, PX_PITCH, memory_budget=stimulus.nbytes)
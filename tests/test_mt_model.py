@@ -0,0 +1,47 @@
+import numpy as np
+from scipy import sparse
+from motionenergy import decoding, mt_model, pooling_schemes
+
+CHANNELS = [(f, theta) for f in (0.5, 1.0, 2.0) for theta in np.arange(0.0, 360.0, 30.0)]
+PREFERRED_SPEEDS = decoding.channel_speeds(CHANNELS, temporal_frequency=2.0)
+UNITS = pooling_schemes.new_mt_units(list(np.arange(0.0, 360.0, 45.0)), [1.0, 2.0, 4.0])
+
+
+def _component_energy(direction_deg, speed):
+    # each channel is driven by the component of the velocity along its direction
+    thetas = np.deg2rad([theta for _, theta in CHANNELS])
+    normal_speed = speed * np.cos(thetas - np.deg2rad(direction_deg))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = np.log2(PREFERRED_SPEEDS) - np.log2(normal_speed)
+    return np.where(normal_speed > 0, np.exp(-0.5 * (offset / 0.5) ** 2), 0.0)
+
+
+def test_pooling_schemes_are_sparse_and_tuned():
+    for weights in (pooling_schemes.vector_average_weights(CHANNELS, PREFERRED_SPEEDS, UNITS),
+                    pooling_schemes.intersection_of_constraints_weights(CHANNELS, PREFERRED_SPEEDS, UNITS)):
+        assert sparse.issparse(weights)
+        assert weights.shape == (len(UNITS), len(CHANNELS))
+        assert weights.nnz < 0.75 * len(UNITS) * len(CHANNELS)
+
+        energy = np.stack([_component_energy(90.0, 2.0)] * 3)
+        responses = mt_model.mt_responses(energy, weights)
+        assert responses.shape == (3, len(UNITS))
+        assert UNITS[int(responses[0].argmax())][0] == 90.0
+
+
+def test_intersection_of_constraints_recovers_pattern_speed():
+    weights = pooling_schemes.intersection_of_constraints_weights(CHANNELS, PREFERRED_SPEEDS, UNITS)
+    responses = mt_model.mt_responses(_component_energy(225.0, 4.0)[np.newaxis], weights)
+    assert UNITS[int(responses[0].argmax())] == (225.0, 4.0)
+
+
+def test_mt_responses_blocks_match_dense_matmul_for_maps():
+    rng = np.random.default_rng(0)
+    maps = rng.random((10, len(CHANNELS), 6, 8))
+    channel_weights = pooling_schemes.vector_average_weights(CHANNELS, PREFERRED_SPEEDS, UNITS)
+    weights = pooling_schemes.spatial_pooling_weights(channel_weights, (6, 8), stride=4, sigma=2.0)
+
+    responses = mt_model.mt_responses(maps, weights, block_size=3)
+
+    assert weights.shape == (len(UNITS) * 1 * 2, len(CHANNELS) * 6 * 8)
+    np.testing.assert_allclose(responses, maps.reshape(10, -1) @ weights.toarray().T)
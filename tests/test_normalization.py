@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from motionenergy import gabor, normalization
+
+FREQUENCIES = [0.5, 1.0, 2.0]
+THETAS = [0.0, 45.0, 90.0, 135.0]
+
+
+def _channels():
+    _, channels = gabor.new_filter_bank(FREQUENCIES, THETAS, 0.02)
+    return channels[0]
+
+
+def test_pool_weights_follow_channel_metadata():
+    channels = _channels()
+    across_orientation = normalization.pool_weights(channels, across=("orientation",))
+    across_frequency = normalization.pool_weights(channels, across=("frequency",))
+
+    np.testing.assert_allclose(across_orientation.sum(axis=1), 1.0)
+    for i, (f_i, theta_i) in enumerate(channels):
+        for j, (f_j, theta_j) in enumerate(channels):
+            assert (across_orientation[i, j] > 0) == (f_i == f_j)
+            assert (across_frequency[i, j] > 0) == (theta_i == theta_j)
+    np.testing.assert_array_equal(normalization.pool_weights(channels, across=()), np.eye(len(channels)))
+
+    with pytest.raises(ValueError):
+        normalization.pool_weights(channels, across=("space",))
+
+
+def test_divisive_normalization_matches_per_channel_formula():
+    channels = _channels()
+    energy = np.random.default_rng(0).random((5, len(channels)))
+    weights = normalization.pool_weights(channels)
+
+    normalized = normalization.divisive_normalization(energy, weights, semi_saturation=0.3, exponent=1.5)
+
+    expected = np.empty_like(energy)
+    for t in range(energy.shape[0]):
+        for i in range(len(channels)):
+            pool = sum(weights[i, j] * energy[t, j] ** 1.5 for j in range(len(channels)))
+            expected[t, i] = energy[t, i] ** 1.5 / (0.3 ** 1.5 + pool)
+    np.testing.assert_allclose(normalized, expected)
+
+
+def test_divisive_normalization_pools_energy_maps_over_space():
+    channels = _channels()
+    maps = np.random.default_rng(1).random((2, len(channels), 8, 9))
+    weights = normalization.pool_weights(channels)
+
+    pointwise = normalization.divisive_normalization(maps, weights)
+    global_pool = normalization.divisive_normalization(maps, weights, spatial_sigma=np.inf)
+    smoothed = normalization.divisive_normalization(maps, weights, spatial_sigma=2.0)
+
+    np.testing.assert_allclose(pointwise[:, :, 3, 4],
+                               normalization.divisive_normalization(maps[:, :, 3, 4], weights))
+    pool = np.einsum('ij,tjhw->ti', weights, maps ** 2) / (8 * 9)
+    np.testing.assert_allclose(global_pool, maps ** 2 / (1.0 + pool[:, :, np.newaxis, np.newaxis]))
+    assert smoothed.shape == maps.shape
+    with pytest.raises(ValueError):
+        normalization.divisive_normalization(maps[:, :, 0, 0], weights, spatial_sigma=2.0)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from motionenergy import observer
+
+
+def test_ddm_matches_analytic_choice_probability_and_decision_time():
+    drift, bound, dt = 1.0, 1.0, 1e-3
+    evidence = np.full(5000, drift)
+    result = observer.simulate_ddm(evidence, 20000, dt, bound=bound, seed=0)
+
+    assert (result.choices == -1).mean() < 1e-3
+    # symmetric bounds, unit noise: P(upper) = 1 / (1 + exp(-2 v a)), E[DT] = (a / v) tanh(a v)
+    assert abs((result.choices == 1).mean() - 1 / (1 + np.exp(-2 * drift * bound))) < 0.015
+    assert abs(np.nanmean(result.rts) - bound / drift * np.tanh(bound * drift)) < 0.03
+
+
+def test_simulators_are_reproducible_per_seed():
+    evidence = np.random.default_rng(0).random((200, 3))
+    first = observer.simulate_race(evidence, 500, 1 / 60, seed=42)
+    second = observer.simulate_race(evidence, 500, 1 / 60, seed=42)
+    other = observer.simulate_race(evidence, 500, 1 / 60, seed=observer.condition_seeds(42, 2)[1])
+
+    np.testing.assert_array_equal(first.choices, second.choices)
+    np.testing.assert_array_equal(first.rts, second.rts)
+    assert not np.array_equal(first.rts, other.rts)
+
+
+def test_race_and_switching_favour_the_stronger_alternative():
+    evidence = np.tile([3.0, 0.5], (600, 1))
+    for result in (observer.simulate_race(evidence, 4000, 1 / 60, seed=1),
+                   observer.simulate_switching(evidence, 4000, 1 / 60, switch_probability=0.1, seed=1)):
+        assert result.choices.shape == result.rts.shape == (4000,)
+        assert (result.choices == 0).mean() > 0.8
+
+
+def test_undecided_trials_time_out():
+    result = observer.simulate_ddm(np.zeros(3), 100, 1 / 60, noise=0.0, non_decision_time=0.3)
+    assert (result.choices == -1).all() and np.isnan(result.rts).all()
+    with pytest.raises(ValueError):
+        observer.simulate_switching(np.zeros((3, 1)), 10, 1 / 60, switch_probability=0.5)
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from motionenergy import drifting_sinusoidal, energy, pipeline
+
+GRATING = (2.0, (1.6, 1.6), 0.0, 0.0, 2.0, 1.0, 0.25, 120.0, 0.05)
+FREQUENCIES = [2.0, 4.0]
+THETAS = [0.0, 45.0, 90.0, 135.0]
+
+
+def test_pipeline_matches_compute_features():
+    source = pipeline.synthetic_source(*GRATING, realtime=False)
+    stimulus = drifting_sinusoidal.new_stimulus(*GRATING, dtype=np.float32)
+    run = pipeline.motion_energy_pipeline(source, stimulus.shape[1:], FREQUENCIES, THETAS, GRATING[-1],
+                                          decide=lambda energy: energy, drop_policy="block")
+    report = asyncio.run(run.run())
+
+    assert report.frames == len(stimulus) == len(report.results)
+    assert report.dropped == {"transform": 0, "energy": 0, "decision": 0}
+    assert [frame.index for frame in report.results] == list(range(len(stimulus)))
+    np.testing.assert_allclose(np.stack([frame.data for frame in report.results]),
+                               energy.compute_features(stimulus, FREQUENCIES, THETAS, GRATING[-1]), rtol=1e-6)
+    for name in ("transform", "energy", "decision", pipeline.END_TO_END):
+        assert report.latencies[name].count == len(stimulus)
+
+
+@pytest.mark.parametrize("drop_policy", ["drop_oldest", "drop_newest"])
+def test_source_that_is_not_live_is_never_dropped(drop_policy):
+    source = pipeline.synthetic_source(*GRATING, realtime=False)
+    assert not source.live
+    run = pipeline.motion_energy_pipeline(source, (32, 32), FREQUENCIES, THETAS, GRATING[-1],
+                                          drop_policy=drop_policy)
+    report = asyncio.run(run.run())
+
+    assert report.frames == len(report.results) == 30
+    assert report.dropped == {"transform": 0, "energy": 0, "decision": 0}
+
+
+def test_slow_stage_drops_frames_but_keeps_order():
+    def slow(data):
+        time.sleep(0.02)
+        return data
+
+    source = pipeline.synthetic_source(*GRATING)
+    run = pipeline.Pipeline(source, [pipeline.Stage("slow", slow)], drop_policy="drop_oldest", queue_size=1)
+    report = asyncio.run(run.run())
+
+    processed = len(report.results)
+    assert report.dropped["slow"] > 0
+    assert processed + report.dropped["slow"] == report.frames
+    indices = [frame.index for frame in report.results]
+    assert indices == sorted(indices) and indices[-1] == report.frames - 1
+    assert report.latencies["slow"].percentile(50) >= 0.02
+
+
+def test_pipeline_keeps_up_with_realtime_source():
+    # the 96x96 px frame, one second at 120 fps, of the claim in the pipeline module's docstring
+    speed, _, theta, phase, frequency, amplitude, _, fps, px_pitch = GRATING
+    source = pipeline.synthetic_source(speed, (4.8, 4.8), theta, phase, frequency, amplitude, 1.0, fps, px_pitch)
+    run = pipeline.motion_energy_pipeline(source, (96, 96), FREQUENCIES, THETAS, px_pitch)
+    report = asyncio.run(run.run())
+
+    assert report.frames == len(report.results) == fps
+    assert report.dropped == {"transform": 0, "energy": 0, "decision": 0}
+    assert report.latencies[pipeline.END_TO_END].percentile(99) < 2 / fps
+
+
+def test_failing_stage_stops_the_pipeline():
+    def fail(data):
+        raise RuntimeError("stage failed")
+
+    source = pipeline.synthetic_source(*GRATING, realtime=False)
+    run = pipeline.Pipeline(source, [pipeline.Stage("fail", fail)], drop_policy="block", queue_size=1)
+    with pytest.raises(RuntimeError, match="stage failed"):
+        asyncio.run(asyncio.wait_for(run.run(), timeout=10))
+
+
+def test_latency_histogram_percentiles():
+    histogram = pipeline.LatencyHistogram()
+    for seconds in [0.001] * 98 + [0.05, 0.2]:
+        histogram.record(seconds)
+    summary = histogram.summary()
+    assert summary["count"] == 100 and summary["max"] == 0.2
+    assert 0.001 <= summary["p50"] < 0.0013
+    assert 0.05 <= summary["p99"] < 0.064
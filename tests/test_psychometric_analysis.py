@@ -0,0 +1,49 @@
+import numpy as np
+from motionenergy import decoding, psychometric_analysis as pa
+
+SETTINGS = pa.SweepSettings(size=(0.6, 0.6), spatial_frequency=2.0, time=0.1, fps=30.0, px_pitch=0.02,
+                            frequencies=(2.0, 4.0), thetas=(0.0, 45.0, 90.0, 135.0), num_trials=3, seed=7)
+
+
+def test_sweep_checkpoints_and_resumes(tmp_path):
+    conditions = pa.condition_grid(speeds=[1.0], coherences=[0.5, 1.0], contrasts=[1.0], orientations=[0.0, 45.0])
+    paths = pa.run_sweep(conditions[:2], SETTINGS, tmp_path, workers=2)
+    assert all(path.exists() for path in paths)
+    first_mtimes = [path.stat().st_mtime_ns for path in paths]
+
+    all_paths = pa.run_sweep(conditions, SETTINGS, tmp_path, workers=1)
+
+    assert all_paths[:2] == paths
+    assert [path.stat().st_mtime_ns for path in paths] == first_mtimes  # skipped, not recomputed
+    assert len(list(tmp_path.glob("*.npz"))) == len(conditions)
+    condition, results = pa.load_condition(all_paths[3])
+    assert condition == conditions[3]
+    assert results["direction"].shape == results["magnitude"].shape == (3, 3)
+    assert "speed" not in results
+    assert results["mean_energy"].shape == (3, 8)
+
+
+def test_condition_results_are_reproducible():
+    condition = pa.SweepCondition(speed=1.0, coherence=0.3, contrast=0.5, orientation=45.0)
+    first = pa.run_condition(condition, SETTINGS)
+    second = pa.run_condition(condition, SETTINGS)
+    for name in first:
+        np.testing.assert_array_equal(first[name], second[name])
+
+
+def test_orientation_decoder_trains_from_sweep_checkpoints(tmp_path):
+    settings = pa.SweepSettings(size=(0.6, 0.6), spatial_frequency=2.0, time=0.1, fps=30.0, px_pitch=0.02,
+                                frequencies=(2.0, 4.0), thetas=(0.0, 45.0, 90.0, 135.0), num_trials=4)
+    conditions = pa.condition_grid([1.0], [0.8], [1.0], [0.0, 45.0, 90.0, 135.0])
+    paths = pa.run_sweep(conditions, settings, tmp_path, workers=1)
+
+    decoder = decoding.StreamingLeastSquares(8, 2, ridge=1e-3)
+    for features, labels in pa.iter_sweep_batches(paths, "orientation", batch_size=3,
+                                                               rng=np.random.default_rng(0)):
+        assert features.shape[1] == 8 and len(features) <= 3
+        decoder.partial_fit(features, decoding.orientation_targets(labels))
+
+    features, labels = next(pa.iter_sweep_batches(paths[1:2], "orientation"))
+    decoded = decoding.orientation_from_targets(decoder.predict(features))
+    error = np.abs((decoded - labels + 90.0) % 180.0 - 90.0)
+    assert error.max() < 10.0
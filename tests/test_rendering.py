@@ -0,0 +1,49 @@
+from time import perf_counter
+
+import numpy as np
+
+from motionenergy import gabor, rendering
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def test_filter_bank_montage_places_every_kernel():
+    (even, _), _ = gabor.new_filter_bank([2.0, 4.0], [0.0, 45.0, 90.0], 0.05)
+    montage = rendering.filter_bank_montage(even, columns=3, padding=1)
+    cell = even[0].shape[0]  # the lowest frequency has the largest kernel
+    assert montage.shape == (2 * cell + 1, 3 * cell + 2)
+    np.testing.assert_allclose(montage[:cell, :cell], even[0] / np.abs(even[0]).max())
+    assert np.isnan(montage[:, cell]).all()
+    small = even[3]
+    offset = (cell - small.shape[0]) // 2
+    np.testing.assert_allclose(montage[cell + 1 + offset:cell + 1 + offset + small.shape[0], offset:offset + small.shape[1]],
+                               small / np.abs(small).max())
+
+
+def test_montage_and_heatmaps_write_pngs(tmp_path):
+    (even, _), _ = gabor.new_filter_bank([2.0, 4.0], [0.0, 90.0], 0.05)
+    rendering.write_montage_png(rendering.filter_bank_montage(even), tmp_path / "bank.png")
+    assert (tmp_path / "bank.png").read_bytes().startswith(PNG_SIGNATURE)
+
+    rng = np.random.default_rng(0)
+    energies = [rng.random((10, 4)) for _ in range(20)]
+    start = perf_counter()
+    paths = rendering.render_heatmaps(energies, [2.0, 4.0], [0.0, 90.0], tmp_path / "heatmaps",
+                                      titles=[f"condition {i}" for i in range(20)])
+    per_plot = (perf_counter() - start) / len(energies)
+    assert len(paths) == 20 and all(path.read_bytes().startswith(PNG_SIGNATURE) for path in paths)
+    assert per_plot < 0.5
+    # different data gives different images from the reused figure
+    assert paths[0].read_bytes() != paths[1].read_bytes()
+
+
+def test_untitled_heatmap_resets_the_title(tmp_path):
+    renderer = rendering.HeatmapRenderer([2.0, 4.0], [0.0, 90.0])
+    energy = np.random.default_rng(0).random(4)
+    renderer.render(energy, tmp_path / "titled.png", title="condition 0")
+    renderer.render(energy, tmp_path / "untitled.png")
+    assert renderer.title.get_text() == rendering.DEFAULT_HEATMAP_TITLE
+
+    fresh = rendering.HeatmapRenderer([2.0, 4.0], [0.0, 90.0])
+    fresh.render(energy, tmp_path / "fresh.png")
+    assert (tmp_path / "untitled.png").read_bytes() == (tmp_path / "fresh.png").read_bytes()